@@ -0,0 +1,46 @@
+"""Benchmark the time needed to import ddesigner.
+
+Each measure is taken in a fresh interpreter. Run from the repository
+root:
+
+    python benchmarks/bench_import.py [repetitions]
+"""
+import os.path as op
+import statistics
+import subprocess
+import sys
+
+ROOT = op.abspath(op.join(op.dirname(__file__), '..'))
+FILES_PATH = op.join(ROOT, 'tests', 'files')
+
+SNIPPETS = {
+    'import ddesigner': 'import ddesigner',
+    'import + load chain1.json': (
+        'import ddesigner\n'
+        f'ddesigner.from_file(open({op.join(FILES_PATH, "chain1.json")!r}))'),
+    'import + evaluate a condition': (
+        'import ddesigner.conditional as c\n'
+        'c.arithm_expression_evaluate("1 + 1", {})'),
+}
+
+
+def measure(snippet: str) -> float:
+    """Return the time (s) needed to run the snippet in a new process."""
+    code = ('import time\n'
+            'start = time.perf_counter()\n'
+            f'{snippet}\n'
+            'print(time.perf_counter() - start)')
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT,
+                            check=True, capture_output=True, text=True)
+    return float(output.stdout)
+
+
+def main(repetitions: int = 20):
+    for name, snippet in SNIPPETS.items():
+        times = [measure(snippet) for _ in range(repetitions)]
+        print(f'{name:32} median {statistics.median(times) * 1000:8.2f} ms'
+              f'  min {min(times) * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,80 @@
+"""Benchmark the memory used by loaded dialogues.
+
+A synthetic export (mixing messages with choices, conditions, random
+branches and set variable nodes) is loaded with from_json, and the
+memory still allocated afterwards (measured with tracemalloc) is
+reported. Run from the repository root:
+
+    python benchmarks/bench_memory.py [node_count]
+"""
+import gc
+import json
+import os.path as op
+import sys
+import tracemalloc
+
+sys.path.insert(0, op.abspath(op.join(op.dirname(__file__), '..')))
+
+import ddesigner       # NOQA
+
+CHARACTERS = ['Player', 'Merchant', 'Guard', 'Narrator']
+
+
+def make_export(node_count: int) -> str:
+    """Return the json of an export containing node_count nodes."""
+    nodes = [{'node_name': 'START', 'node_type': 'start', 'title': '',
+              'next': '0'}]
+    for i in range(node_count - 1):
+        name, next_ = str(i), str(i + 1)
+        kind = i % 4
+
+        if kind == 0:
+            nodes.append({
+                'node_name': name, 'node_type': 'show_message',
+                'title': 'Show Message',
+                'character': [CHARACTERS[i % len(CHARACTERS)], 0],
+                'file': '', 'is_box': False, 'next': None,
+                'object_path': '', 'slide_camera': True, 'speaker_type': 0,
+                'text': {'ENG': f'Message {i}, ${{var1}}',
+                         'ITA': f'Messaggio {i}'},
+                'choices': [{'is_condition': False, 'next': next_,
+                             'text': {'ENG': 'Yes', 'ITA': 'Si'}},
+                            {'is_condition': True, 'condition': 'var1 > 1',
+                             'next': next_,
+                             'text': {'ENG': 'No', 'ITA': 'No'}}]})
+        elif kind == 1:
+            nodes.append({'node_name': name, 'node_type': 'condition_branch',
+                          'title': 'Condition Branch', 'text': 'var1 > 1',
+                          'branches': {'True': next_, 'False': next_}})
+        elif kind == 2:
+            nodes.append({'node_name': name, 'node_type': 'random_branch',
+                          'title': 'Random Branch', 'possibilities': 2,
+                          'branches': {'1': next_, '2': next_, '3': None}})
+        else:
+            nodes.append({'node_name': name,
+                          'node_type': 'set_local_variable',
+                          'title': 'Set Local Variable', 'next': next_,
+                          'var_name': 'var1', 'value': 1, 'toggle': None,
+                          'operation_type': 'ADD'})
+
+    return json.dumps([{'nodes': nodes,
+                        'variables': {'var1': {'type': 1, 'value': 0}}}])
+
+
+def main(node_count: int = 100000):
+    export = make_export(node_count)
+
+    gc.collect()
+    tracemalloc.start()
+    data = ddesigner.from_json(export, decoder='json')
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{len(data.nodes):,} nodes: {size / 2 ** 20:8.1f} MiB '
+          f'({size / len(data.nodes):.0f} bytes/node), '
+          f'peak {peak / 2 ** 20:8.1f} MiB')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
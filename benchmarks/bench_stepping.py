@@ -0,0 +1,66 @@
+"""Benchmark the stepping throughput of Dialogue.
+
+Long chains of non-blocking nodes ending in a show message node are
+walked repeatedly. The "mixed" chain contains set variable, condition,
+random and passthrough nodes, the "passthrough" chain only contains
+runs of passthrough nodes separated by set variable nodes. Run from the
+repository root:
+
+    python benchmarks/bench_stepping.py [chain_length] [repetitions]
+"""
+import os.path as op
+import sys
+import timeit
+
+sys.path.insert(0, op.abspath(op.join(op.dirname(__file__), '..')))
+
+from ddesigner.default_model import *       # NOQA
+from ddesigner.model import *               # NOQA
+
+
+def make_data(chain_length: int, period: int = 5) -> DialogueData:
+    """Return a data containing a cyclic chain of the given length.
+
+    A set variable node is placed every "period" nodes. If period is
+    5, the chain is mixed, otherwise only passthrough nodes are used
+    in between.
+    """
+    nodes = [SimpleNode(START_NODE_NAME, 'start', '', '0')]
+    for i in range(chain_length):
+        name, next_ = str(i), str(i + 1)
+        kind = i % period
+        if period != 5 and kind:
+            kind = 4
+
+        if kind == 0:
+            nodes.append(SetVariableNode(name, '', '', next_, 'var1', 1,
+                                         operation_type='ADD'))
+        elif kind == 1:
+            nodes.append(ConditionBranchNode(
+                name, '', '', 'var1 > 0 && var2 == "hello"',
+                {'True': next_, 'False': next_}))
+        elif kind == 2:
+            nodes.append(RandomBranchNode(name, '', '',
+                                          branches={'1': next_, '2': next_}))
+        else:
+            nodes.append(SimpleNode(name, '', '', next_))
+
+    nodes.append(ShowMessageNode(str(chain_length), '', '', '0'))
+
+    return DialogueData(nodes, {'var1': 0, 'var2': 'hello'}, compile=True)
+
+
+def main(chain_length: int = 1000, repetitions: int = 200):
+    for name, period in (('mixed', 5), ('passthrough', 50)):
+        dial = Dialogue(make_data(chain_length, period))
+        dial.next_iter()
+
+        seconds = min(timeit.repeat(dial.next_iter, number=repetitions,
+                                    repeat=5))
+        steps = (chain_length + 1) * repetitions
+        print(f'{name:12} {steps / seconds:14,.0f} steps/s '
+              f'({seconds / steps * 1e9:.0f} ns/step)')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
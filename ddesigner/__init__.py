@@ -1,52 +1,133 @@
-import json
-from typing import TextIO
+import dataclasses
+import functools
+import importlib
+import os
+from typing import TextIO, BinaryIO, Callable, Iterable, Union
 
 from . import model
 from . import default_model
-from . import conditional
 
 from ddesigner.model import *
 
 
+def __getattr__(name):
+    """Lazily import the expression engine (ddesigner.conditional).
+
+    Importing the engine requires lark, which is only needed when
+    conditions are actually evaluated.
+    """
+    if name == 'conditional':
+        return importlib.import_module('.conditional', __name__)
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 class UnsupportedNodeError(Exception):
     """Custom error for unsopported node types."""
     pass
 
 
-def from_json(json_str, node_map=default_model.NODE_TYPE_MAP) -> DialogueData:
-    """Import and return data from json.
+# Modules usable to decode json, in order of preference (see
+# json_decoder). All of them provide a loads function accepting both
+# str and bytes.
+JSON_BACKENDS = ('orjson', 'ujson', 'simdjson', 'json')
+
+
+@functools.lru_cache(maxsize=None)
+def json_decoder(backend: str = None) -> Callable:
+    """Return the function used to decode json (loads) of a backend.
+
+    backend is the name of a module providing a loads function (eg.
+    one of JSON_BACKENDS). If None, the first installed module from
+    JSON_BACKENDS is used (json, from the standard library, is always
+    available). ImportError is raised if the given backend is not
+    installed.
+    """
+    if backend is None:
+        for name in JSON_BACKENDS:
+            try:
+                return json_decoder(name)
+            except ImportError:
+                pass
+
+    return importlib.import_module(backend).loads
+
+
+def from_json(json_str: Union[str, bytes],
+              node_map=default_model.NODE_TYPE_MAP,
+              validate: bool = False, compile: bool = False,
+              decoder: Union[str, Callable] = None,
+              lazy: bool = False) -> DialogueData:
+    """Import and return data from json (str or bytes).
 
     How the json is interpreted and the exact behaviour of the nodes
     highly depends on the given node_map.
     The default node_map will provide a basic implementation of all
     the nodes from the current DialogueDesigner version.
 
+    validate and compile are passed to DialogueData (see
+    DialogueData.validate and DialogueData.compile).
+
+    decoder is the function used to decode the json, or the name of a
+    json backend (see json_decoder). By default, the fastest installed
+    backend is used.
+
+    If lazy is True, the data is lazy (see DialogueData): nodes are
+    only built when first requested, from their json description.
+
     NOTE: the 'repeat' nodes are not supported by the default mapping
     due to how the library internally works. If encountered,
     an UnsupportedNodeError will be rised.
     """
-    ddesginer_dict = json.loads(json_str)[0]
+    if not callable(decoder):
+        decoder = json_decoder(decoder)
+
+    ddesginer_dict = decoder(json_str)[0]
 
     variables = {key: val['value'] for key, val
                  in ddesginer_dict['variables'].items()}
-    nodes = []
+    node_dicts = ddesginer_dict['nodes']
+
+    if lazy:
+        # Report unsupported nodes right away
+        for node_dict in node_dicts:
+            _check_node_type(node_dict, node_map)
+
+        nodes = LazyNodes.from_records(
+            [node_dict['node_name'] for node_dict in node_dicts],
+            node_dicts, functools.partial(_build_node, node_map=node_map))
+    else:
+        nodes = [_build_node(node_dict, node_map)
+                 for node_dict in node_dicts]
+
+    return DialogueData(nodes, variables, validate, compile)
 
-    for node_dict in ddesginer_dict['nodes']:
-        if node_dict['node_type'] not in node_map:
-            raise UnsupportedNodeError(
-                f"Unsupported node type {node_dict['node_type']} "
-                "according to the used node type map")
 
-        nodes.append(node_map[node_dict['node_type']](**node_dict))
+def _check_node_type(node_dict: dict, node_map):
+    if node_dict['node_type'] not in node_map:
+        raise UnsupportedNodeError(
+            f"Unsupported node type {node_dict['node_type']} "
+            "according to the used node type map")
 
-    return DialogueData(nodes, variables)
 
+def _build_node(node_dict: dict, node_map) -> Node:
+    """Return the node described by a dictionary from the json."""
+    _check_node_type(node_dict, node_map)
 
-def from_file(file: TextIO,
-              node_map=default_model.NODE_TYPE_MAP) -> DialogueData:
+    return node_map[node_dict['node_type']](**node_dict)
+
+
+def from_file(file: Union[TextIO, BinaryIO, str, os.PathLike],
+              node_map=default_model.NODE_TYPE_MAP,
+              validate: bool = False, compile: bool = False,
+              decoder: Union[str, Callable] = None,
+              lazy: bool = False) -> DialogueData:
     """Import and return data from file.
 
-    The file content is assumed to be json.
+    file can be a text or binary file object, or a path. The file
+    content is assumed to be json. Paths are opened in binary mode, so
+    that the content is given as is to the decoder, with no
+    decoding to str. See from_json for details about the arguments.
 
     How the json is interpreted and the exact behaviour of the nodes
     highly depends on the given node_map.
@@ -57,4 +138,99 @@ def from_file(file: TextIO,
     due to how the library internally works. If encountered,
     an UnsupportedNodeError will be rised.
     """
-    return from_json(file.read(), node_map)
+    return from_json(_read(file), node_map, validate, compile, decoder, lazy)
+
+
+def _read(file: Union[TextIO, BinaryIO, str, os.PathLike]):
+    """Return the content of a file object or path (bytes for paths)."""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as opened_file:
+            return opened_file.read()
+
+    return file.read()
+
+
+def _plain(value):
+    """Return value with tuples turned to lists (as decoded from json)."""
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+
+    return value
+
+
+def _node_matches(node: Node, node_dict: dict, node_map) -> bool:
+    """Return whether a node would be built as is from node_dict."""
+    if type(node) is not node_map.get(node_dict['node_type']):
+        return False
+
+    names = set()
+    for attr in dataclasses.fields(node):
+        if not attr.init:
+            continue
+
+        names.add(attr.name)
+        if attr.name in node_dict:
+            expected = node_dict[attr.name]
+        elif attr.default is not dataclasses.MISSING:
+            expected = attr.default
+        elif attr.default_factory is not dataclasses.MISSING:
+            expected = attr.default_factory()
+        else:
+            return False
+
+        if _plain(getattr(node, attr.name)) != _plain(expected):
+            return False
+
+    return names.issuperset(node_dict)
+
+
+def reload_json(data: DialogueData, json_str: Union[str, bytes],
+                node_map=default_model.NODE_TYPE_MAP,
+                decoder: Union[str, Callable] = None,
+                dialogues: Iterable[Dialogue] = ()) -> UpdateResult:
+    """Update data in place to match a new version of its json.
+
+    Only the nodes whose description changed are built, then
+    DialogueData.update is called: see it for details about the
+    dialogues currently using the data (given in "dialogues") and
+    the data that can be reloaded. Variables are replaced as well. See
+    from_json for the other arguments.
+    """
+    # Fail before decoding (and building lazy nodes)
+    data._check_update()
+
+    if not callable(decoder):
+        decoder = json_decoder(decoder)
+
+    ddesginer_dict = decoder(json_str)[0]
+
+    variables = {key: val['value'] for key, val
+                 in ddesginer_dict['variables'].items()}
+
+    names = set()
+    changed = []
+    for node_dict in ddesginer_dict['nodes']:
+        names.add(node_dict['node_name'])
+        current = data.nodes.get(node_dict['node_name'])
+        if current is None or not _node_matches(current, node_dict,
+                                                node_map):
+            changed.append(_build_node(node_dict, node_map))
+
+    removed = [name for name in data.nodes if name not in names]
+
+    return data.update(changed, removed, variables, dialogues)
+
+
+def reload_file(data: DialogueData,
+                file: Union[TextIO, BinaryIO, str, os.PathLike],
+                node_map=default_model.NODE_TYPE_MAP,
+                decoder: Union[str, Callable] = None,
+                dialogues: Iterable[Dialogue] = ()) -> UpdateResult:
+    """Update data in place to match a new version of its file.
+
+    See reload_json and from_file.
+    """
+    return reload_json(data, _read(file), node_map, decoder, dialogues)
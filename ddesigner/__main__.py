@@ -0,0 +1,48 @@
+"""Command line interface.
+
+Usage:
+
+    python -m ddesigner compile [--validate] [--prune] input output
+
+compile converts a Dialogue Designer export (json) to the binary
+format (see ddesigner.binary).
+"""
+import argparse
+import sys
+
+import ddesigner
+from ddesigner import binary
+
+
+def compile_command(arguments: argparse.Namespace):
+    data = ddesigner.from_file(arguments.input, validate=arguments.validate)
+    if arguments.prune:
+        data = data.prune_unreachable()
+
+    binary.write(data, arguments.output)
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(prog='ddesigner')
+    subparsers = parser.add_subparsers(required=True)
+
+    compile_parser = subparsers.add_parser(
+        'compile', help='convert an export to the binary format')
+    compile_parser.add_argument('input', help='exported json file')
+    compile_parser.add_argument('output', help='binary file to write')
+    compile_parser.add_argument('--validate', action='store_true',
+                                help='validate the data first')
+    compile_parser.add_argument('--prune', action='store_true',
+                                help='leave out the unreachable nodes')
+    compile_parser.set_defaults(command=compile_command)
+
+    arguments = parser.parse_args(argv)
+    try:
+        arguments.command(arguments)
+    except (ddesigner.ValidationError, ddesigner.UnsupportedNodeError,
+            binary.BinaryFormatError) as error:
+        sys.exit(f'ddesigner: {error}')
+
+
+if __name__ == '__main__':
+    main()
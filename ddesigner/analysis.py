@@ -0,0 +1,293 @@
+"""Exact analysis of the paths of a dialogue, without sampling.
+
+The dialogue is seen as a Markov chain over its nodes: random nodes
+follow their static weights, messages having choices pick one of the
+available ones uniformly and conditions hold with an assumed
+probability (see analyze). Variables are otherwise ignored.
+
+Probabilities are propagated through the strongly connected
+components of the chain in topological order, which is linear in the
+size of the graph. Components containing loops require solving a
+linear system (cubic in the size of the component).
+"""
+from dataclasses import *
+from typing import Mapping
+
+from ddesigner.model import *
+from ddesigner.default_model import *
+from ddesigner.graph import strongly_connected_components
+
+
+# Key used for "no node" (end of a branch) in transitions
+END = None
+
+# Probability of conditions for which no assumption is given
+DEFAULT_PROBABILITY = 0.5
+
+
+def condition_probability(text: str, assumptions: Mapping = {},
+                          default: float = DEFAULT_PROBABILITY,
+                          node_name: str = None) -> float:
+    """Return the probability of a condition holding.
+
+    The probability is looked up in assumptions, by node name first
+    (if given) and then by condition text. Conditions not using any
+    variable are evaluated. Otherwise, default is returned.
+    """
+    for key in (node_name, text):
+        if key is not None and key in assumptions:
+            return float(assumptions[key])
+
+    from ddesigner.conditional import compile_expression
+    from ddesigner.conditional import expression_variables
+
+    if not expression_variables(text):
+        return float(bool(compile_expression(text)({})))
+
+    return default
+
+
+def _uniform_transitions(node, assumptions, default):
+    """Go to one of the successors, with the same probability.
+
+    Nodes having no successors end the dialogue.
+    """
+    successors = node.successors()
+    if not successors:
+        return [(END, 1.)]
+
+    return [(successor, 1 / len(successors)) for successor in successors]
+
+
+def _available_counts(probabilities: list[float]) -> list[float]:
+    """Return the distribution of the number of available choices.
+
+    probabilities are the (independent) probabilities of each choice
+    being available, result[n] is the probability of n choices being
+    available.
+    """
+    counts = [1.]
+    for probability in probabilities:
+        new_counts = [0.] * (len(counts) + 1)
+        for n, count in enumerate(counts):
+            new_counts[n] += count * (1 - probability)
+            new_counts[n + 1] += count * probability
+        counts = new_counts
+
+    return counts
+
+
+def _show_message_transitions(node, assumptions, default):
+    """Pick one of the available choices uniformly, or go to next.
+
+    Unconditional choices are always available, the others when their
+    condition holds. If no choice is available, the message goes to
+    next (as when it has no choices).
+    """
+    probabilities = [condition_probability(choice['condition'],
+                                           assumptions, default)
+                     if choice.get('is_condition') and choice.get('condition')
+                     else 1. for choice in node.choices]
+
+    # A choice is picked if available, with probability 1 / n, n
+    # being the number of available choices (itself included)
+    result = []
+    for i, (choice, probability) in enumerate(zip(node.choices,
+                                                  probabilities)):
+        others = _available_counts(probabilities[:i] + probabilities[i + 1:])
+        result.append((choice['next'], probability
+                       * sum(count / (n + 1)
+                             for n, count in enumerate(others))))
+
+    none_available = 1.
+    for probability in probabilities:
+        none_available *= 1 - probability
+    result.append((node.next, none_available))
+
+    return result
+
+
+def _chance_branch_transitions(node, assumptions, default):
+    total = node.chance_1 + node.chance_2
+    if total <= 0:
+        raise ValueError('Total of weights must be greater than zero')
+
+    return list(zip(node.successors(),
+                    (node.chance_1 / total, node.chance_2 / total)))
+
+
+def _condition_branch_transitions(node, assumptions, default):
+    probability = condition_probability(node.text, assumptions, default,
+                                        node.node_name)
+    false_branch, true_branch = node.successors()
+
+    return [(false_branch, 1 - probability), (true_branch, probability)]
+
+
+# Transition probabilities of the nodes, by implementation of
+# Node._compute. Nodes having unknown implementations go to one of
+# their successors (see Node.successors) with the same probability.
+TRANSITIONS = {
+    ShowMessageNode._compute: _show_message_transitions,
+    ChanceBranchNode._compute: _chance_branch_transitions,
+    ConditionBranchNode._compute: _condition_branch_transitions,
+}
+
+
+def transitions(node: Node, assumptions: Mapping = {},
+                default: float = DEFAULT_PROBABILITY) -> dict:
+    """Return the transition probabilities of a node.
+
+    The result maps the names of the successors (END for the end of a
+    branch) to the probability of going there. Transitions having
+    probability zero are omitted. See condition_probability for the
+    meaning of assumptions and default.
+    """
+    function = TRANSITIONS.get(type(node)._compute, _uniform_transitions)
+
+    result = {}
+    for successor, probability in function(node, assumptions, default):
+        if probability > 0:
+            result[successor] = result.get(successor, 0.) + probability
+
+    return result
+
+
+@dataclass
+class AnalysisResult:
+    """Result of analyze.
+
+    Nodes are identified by name. "visits" maps each node to its
+    expected number of visits (inf for nodes in loops that can't be
+    left), "reach" to the probability of visiting it at least once and
+    "ends" to the probability of ending on it. "unfinished" is the
+    probability of never reaching an end.
+    """
+    visits: dict = field(default_factory=dict)
+    reach: dict = field(default_factory=dict)
+    ends: dict = field(default_factory=dict)
+    unfinished: float = 0.
+
+    def reach_probability(self, node_name: str) -> float:
+        """Return the probability of reaching a node."""
+        return self.reach.get(node_name, 0.)
+
+    def end_probabilities(self) -> dict:
+        """Return the probability of ending on each node."""
+        return dict(self.ends)
+
+
+def _inverse(matrix: list[list[float]]) -> list[list[float]]:
+    """Return the inverse of a square matrix (Gauss-Jordan)."""
+    size = len(matrix)
+    rows = [row + [float(i == j) for j in range(size)]
+            for i, row in enumerate(matrix)]
+
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda row: abs(rows[row][col]))
+        if not rows[pivot][col]:
+            raise ZeroDivisionError('singular matrix')
+
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        pivot_row = rows[col]
+        value = pivot_row[col]
+        pivot_row[:] = [x / value for x in pivot_row]
+
+        for i, row in enumerate(rows):
+            factor = row[col]
+            if i != col and factor:
+                row[:] = [x - factor * y for x, y in zip(row, pivot_row)]
+
+    return [row[size:] for row in rows]
+
+
+def analyze(data: DialogueData, assumptions: Mapping = {},
+            default: float = DEFAULT_PROBABILITY) -> AnalysisResult:
+    """Compute exact path statistics of a dialogue.
+
+    Runs start from the start node. Random nodes pick their branches
+    according to their weights, messages having choices pick one of
+    the available ones uniformly, or go to their next node if none is
+    available (see TRANSITIONS). The probability of a condition
+    (of a condition branch or a choice) holding is taken from
+    assumptions, which maps node names or condition texts to
+    probabilities. Conditions not using variables are evaluated, the
+    others hold with probability default.
+
+    Conditions are assumed independent from each other and from the
+    previous choices (eg. the same condition may hold the first time a
+    node is visited and not hold the second time).
+
+    Successors referring to missing nodes (reached with a probability
+    greater than zero) raise a ValidationError.
+    """
+    nodes = data.node_list
+    index = {node.node_name: node._index for node in nodes}
+
+    # Transitions by node index (END is kept as is)
+    graph = {}
+    errors = []
+    for i, node in enumerate(nodes):
+        graph[i] = {}
+        for successor, probability in transitions(node, assumptions,
+                                                  default).items():
+            if successor is END:
+                graph[i][END] = probability
+            elif successor in index:
+                graph[i][index[successor]] = probability
+            else:
+                errors.append(f'{node.node_name}: next node {successor!r} '
+                              'does not exist')
+
+    if errors:
+        raise ValidationError(errors)
+
+    inflow = [0.] * len(nodes)
+    inflow[data.start_node._index] = 1.
+    visits = [0.] * len(nodes)
+    reach = [0.] * len(nodes)
+    ends = [0.] * len(nodes)
+    unfinished = 0.
+
+    for component in reversed(strongly_connected_components(graph)):
+        members = set(component)
+        if len(component) == 1 and component[0] not in graph[component[0]]:
+            # Visited at most once
+            i, = component
+            visits[i] = reach[i] = inflow[i]
+        elif all(target in members for i in component
+                 for target in graph[i]):
+            # Can't be left, all the nodes are reached
+            total = sum(inflow[i] for i in component)
+            unfinished += total
+            for i in component:
+                visits[i] = float('inf') if total else 0.
+                reach[i] = total
+            continue
+        else:
+            # Expected visits: inflow * (I - Q)^-1, Q being the
+            # transitions inside the component
+            position = {i: k for k, i in enumerate(component)}
+            matrix = [[float(i == j) - graph[i].get(j, 0.)
+                       for j in component] for i in component]
+            fundamental = _inverse(matrix)
+
+            for k, j in enumerate(component):
+                visits[j] = sum(inflow[i] * fundamental[position[i]][k]
+                                for i in component)
+                reach[j] = visits[j] / fundamental[k][k]
+
+        # Propagate outside of the component
+        for i in component:
+            for target, probability in graph[i].items():
+                if target is END:
+                    ends[i] += visits[i] * probability
+                elif target not in members:
+                    inflow[target] += visits[i] * probability
+
+    names = [node.node_name for node in nodes]
+    return AnalysisResult(
+        {name: value for name, value in zip(names, visits) if value},
+        {name: value for name, value in zip(names, reach) if value},
+        {name: value for name, value in zip(names, ends) if value},
+        unfinished)
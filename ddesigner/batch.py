@@ -0,0 +1,366 @@
+"""Batched execution of many dialogue sessions over the same data.
+
+Requires numpy.
+
+Sessions are kept in column form: the current node of each session is
+an index in DialogueData.node_list, variables are numpy arrays (one
+element per session). Sessions sitting on the same node are advanced
+together, with vectorized operations when the node's behaviour is
+known (see DialogueBatch).
+"""
+from collections import ChainMap
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+from ddesigner.model import *
+from ddesigner.default_model import *
+
+
+# Index used for "no node" (end of a branch)
+END = -1
+
+
+class _Missing:
+    """Placeholder for variables that are not defined in a session."""
+
+    def __repr__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+def _column(value, size: int) -> np.ndarray:
+    """Return a new column of the given size, filled with value.
+
+    Booleans, integers and floats get a native dtype, anything else
+    is stored in an object column.
+    """
+    if isinstance(value, (bool, int, float)):
+        return np.full(size, value)
+
+    column = np.empty(size, dtype=object)
+    column.fill(value)
+    return column
+
+
+def _python_value(value):
+    """Convert numpy scalars to the equivalent python objects."""
+    if isinstance(value, np.generic):
+        return value.item()
+
+    return value
+
+
+class RowVariables(MutableMapping):
+    """Mapping of the variables of a single session in a batch."""
+
+    def __init__(self, batch: 'DialogueBatch', row: int):
+        self.batch = batch
+        self.row = row
+
+    def __getitem__(self, name):
+        column = self.batch.columns[name]
+        value = column[self.row]
+        if value is MISSING:
+            raise KeyError(name)
+
+        return _python_value(value)
+
+    def __setitem__(self, name, value):
+        self.batch.assign(name, np.array([self.row]), value)
+
+    def __delitem__(self, name):
+        self[name]
+        self.batch.assign(name, np.array([self.row]), MISSING)
+
+    def __iter__(self):
+        return (name for name, column in self.batch.columns.items()
+                if column[self.row] is not MISSING)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class ColumnsView(Mapping):
+    """Mapping of the variable columns of a group of sessions.
+
+    Columns are sliced (on the given rows) lazily, when accessed.
+    Columns containing MISSING values can't be accessed (KeyError).
+    """
+
+    def __init__(self, batch: 'DialogueBatch', rows: np.ndarray):
+        self.batch = batch
+        self.rows = rows
+
+    def __getitem__(self, name):
+        column = self.batch.columns[name][self.rows]
+        if column.dtype == object and any(value is MISSING
+                                          for value in column):
+            raise KeyError(name)
+
+        return column
+
+    def __iter__(self):
+        return iter(self.batch.columns)
+
+    def __len__(self):
+        return len(self.batch.columns)
+
+
+def _target(batch, node) -> int:
+    """Return the index of a successor.
+
+    Successors can be linked (see Node.link) or names (eg. in lazy
+    data, see DialogueData), which are looked up in the data.
+    """
+    if node is None:
+        return END
+
+    if isinstance(node, str):
+        # Missing nodes raise the same error as Node.get_next
+        return batch.data.nodes[node]._index
+
+    return node._index
+
+
+def _step_generic(batch, node, rows, choices):
+    """Compute the node once for each session (no vectorization)."""
+    result = np.empty(len(rows), dtype=np.intp)
+    for i, row in enumerate(rows):
+        if choices is None or choices[row] < 0:
+            args = ()
+        else:
+            args = (int(choices[row]),)
+        next_ = node.get_next(RowVariables(batch, row), *args)
+        result[i] = _target(batch, next_)
+
+    return result
+
+
+def _step_simple(batch, node, rows, choices):
+    return np.full(len(rows), _target(batch, node._next or node.next))
+
+
+def _step_show_message(batch, node, rows, choices):
+    result = _step_simple(batch, node, rows, choices)
+    if choices is None or not node.choices:
+        return result
+
+    row_choices = choices[rows]
+    chosen = row_choices >= 0
+    if chosen.any():
+        targets = np.array([_target(batch, next_) for next_ in
+                            node._choices_next or node.successors()[1:]])
+        result[chosen] = targets[row_choices[chosen]]
+
+    return result
+
+
+def _step_set_variable(batch, node, rows, choices):
+    column = batch.columns.get(node.var_name)
+    if column is None or column.dtype == object:
+        # Python objects, compute row by row
+        return _step_generic(batch, node, rows, None)
+
+    if node.toggle:
+        value = np.logical_not(column[rows])
+    else:
+        value = node.value
+
+    if node.operation_type == OperationType.ADD.value:
+        value = value + column[rows]
+    elif node.operation_type == OperationType.SUBTRACT.value:
+        value = column[rows] - value
+
+    batch.assign(node.var_name, rows, value)
+
+    return _step_simple(batch, node, rows, choices)
+
+
+def _step_execute(batch, node, rows, choices):
+    for row in rows:
+        node._trigger_subscribers(RowVariables(batch, row))
+
+    return _step_simple(batch, node, rows, choices)
+
+
+def _step_condition_branch(batch, node, rows, choices):
+    from ddesigner.conditional import vectorized_expression_evaluate
+
+    false_target, true_target = (
+        _target(batch, branch)
+        for branch in node._branches or node.successors())
+    try:
+        values = vectorized_expression_evaluate(
+            node.text, ColumnsView(batch, rows), len(rows))
+    except (KeyError, FloatingPointError):
+        # Some sessions miss a variable (which may not even be needed
+        # due to short circuiting) or make an invalid operation,
+        # compute row by row
+        return _step_generic(batch, node, rows, None)
+
+    return np.where(values, true_target, false_target)
+
+
+def _step_random_branch(batch, node, rows, choices):
+    targets = np.array([_target(batch, branch) for branch in
+                        node._branches or node.successors()])
+    return targets[batch.rng.integers(len(targets), size=len(rows))]
+
+
+def _step_chance_branch(batch, node, rows, choices):
+    targets = np.array([_target(batch, branch) for branch in
+                        node._branches or node.successors()])
+    total = node.chance_1 + node.chance_2
+    if total <= 0:
+        raise ValueError('Total of weights must be greater than zero')
+
+    second = batch.rng.random(len(rows)) * total >= node.chance_1
+    return targets[second.astype(np.intp)]
+
+
+# Vectorized implementations of Node._compute, by implementation.
+# Nodes overriding _compute with unknown implementations are computed
+# once per session.
+VECTORIZED_STEPS = {
+    SimpleNode._compute: _step_simple,
+    ShowMessageNode._compute: _step_show_message,
+    SetVariableNode._compute: _step_set_variable,
+    ExecuteNode._compute: _step_execute,
+    ConditionBranchNode._compute: _step_condition_branch,
+    RandomBranchNode._compute: _step_random_branch,
+    ChanceBranchNode._compute: _step_chance_branch,
+}
+
+
+class DialogueBatch:
+    """A batch of dialogue sessions over the same DialogueData.
+
+    Behaves like "size" Dialogue instances, advanced all at once
+    (see next and next_iter). The current node of each session is kept
+    in self.current (indices of DialogueData.node_list), the variables
+    in self.columns (mapping variable names to arrays). Initial values
+    are copied from the data variables and Dialogue.global_variables.
+    Values of variables that are not defined in a session are MISSING.
+
+    Random nodes use the batch's own generator (self.rng, a
+    numpy.random.Generator, seeded by "seed"), not RandomNode.rand.
+    """
+
+    def __init__(self, data: DialogueData, size: int, seed=None):
+        self.data = data
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+
+        self.current = np.full(size, data.start_node._index, dtype=np.intp)
+
+        initial = ChainMap(data.variables, Dialogue.global_variables)
+        self.columns = {name: _column(initial.get(name, MISSING), size)
+                        for name in data.known_variables()}
+
+        # Whether next_iter stops on a node, by index (END included)
+        self._stops = np.array(
+            [node.blocking is Blocking.BLOCKING for node in data.node_list]
+            + [True])
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name) -> np.ndarray:
+        """Access a variable column."""
+        return self.columns[name]
+
+    def assign(self, name: str, rows: np.ndarray, values):
+        """Set a variable for the given sessions (rows).
+
+        values can be a single value or an array (one value per
+        row). If necessary, the column is converted to a dtype able to
+        hold the values exactly: to a larger dtype of the same kind
+        (eg. int32 to int64) or to object (eg. when assigning a float
+        or a string to an integer column).
+        """
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = _column(MISSING, self.size)
+
+        if not isinstance(values, np.ndarray):
+            values = _column(values, len(rows))
+
+        if values.dtype != column.dtype and column.dtype != object:
+            if values.dtype.kind == column.dtype.kind:
+                column = column.astype(np.result_type(column, values))
+            else:
+                column = column.astype(object)
+            self.columns[name] = column
+
+        column[rows] = values
+
+    def variables(self, row: int) -> MutableMapping:
+        """Return a mapping of the variables of one session."""
+        return RowVariables(self, row)
+
+    def state(self, row: int) -> SessionState:
+        """Return the state of one session (see SessionState).
+
+        All the defined variables of the session are part of the
+        state.
+        """
+        return SessionState(int(self.current[row]),
+                            dict(RowVariables(self, row)) or None)
+
+    def next(self, choices: np.ndarray = None,
+             mask: np.ndarray = None) -> np.ndarray:
+        """Advance each session to its next node, like Dialogue.next.
+
+        Return an array containing the index of the next node of each
+        session (END if there is none, in which case the session
+        doesn't move).
+
+        choices is an optional array of choice indices (see
+        ShowMessageNode), negative values meaning no choice. Choices are
+        ignored by the other default nodes, and passed to get_next by
+        nodes having a custom implementation. If mask (a
+        boolean array) is given, only the selected sessions are
+        advanced (END is returned for the others).
+        """
+        rows = np.arange(self.size) if mask is None else np.flatnonzero(mask)
+        result = np.full(self.size, END, dtype=np.intp)
+        if not len(rows):
+            return result
+
+        # Group sessions by current node
+        current = self.current[rows]
+        order = np.argsort(current, kind='stable')
+        rows, current = rows[order], current[order]
+        bounds = np.flatnonzero(np.diff(current)) + 1
+
+        node_list = self.data.node_list
+        for group in np.split(rows, bounds):
+            node = node_list[self.current[group[0]]]
+            step = VECTORIZED_STEPS.get(type(node)._compute, _step_generic)
+            result[group] = step(self, node, group, choices)
+
+        moved = rows[result[rows] != END]
+        self.current[moved] = result[moved]
+
+        return result
+
+    def next_iter(self, choices: np.ndarray = None,
+                  mask: np.ndarray = None) -> np.ndarray:
+        """Advance each session to its next blocking node.
+
+        Equivalent to Dialogue.next_iter, see next for the arguments
+        and the returned value. Choices only apply to the first
+        computed node of each session.
+        """
+        result = self.next(choices, mask)
+        active = ~self._stops[result]
+
+        while active.any():
+            step = self.next(mask=active)
+            result[active] = step[active]
+            active &= ~self._stops[result]
+
+        return result
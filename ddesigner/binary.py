@@ -0,0 +1,370 @@
+"""Compact binary format for precompiled dialogues.
+
+A DialogueData is written (see write) as:
+
+- A header (see HEADER).
+- A string table: all the strings used by the data, stored once.
+- A record for each node (see RECORD): name, class and position of
+  the constructor arguments and of the precompiled state.
+- The values: constructor arguments, precompiled state
+  (see PRECOMPILERS) and metadata (node classes and variables),
+  encoded as described by _encode.
+
+The loader (see load) maps the file in memory and returns a lazy
+DialogueData (see LazyNodes): nodes are decoded on first access, and
+their successors are looked up by name. Pages of the file are shared
+by all the processes loading it.
+Loading never requires parsing json or conditions.
+
+Node classes are stored by name and imported when loading: only load
+trusted files.
+"""
+import importlib
+import mmap
+import os
+import struct
+from typing import BinaryIO, Union
+
+from ddesigner.model import *
+from ddesigner.default_model import *
+from ddesigner.expressions import compile_source
+
+
+MAGIC = b'DDSGNBIN'
+VERSION = 2
+
+# magic, version, string count, node count, string table offset,
+# records offset, values offset, metadata offset (in the values)
+HEADER = struct.Struct('<8sIIIIIII')
+# name (string id), class index, arguments offset, precompiled state
+# offset (NO_VALUE if none).
+# Offsets are relative to the values.
+RECORD = struct.Struct('<IIII')
+NO_VALUE = 0xFFFFFFFF
+
+_UINT = struct.Struct('<I')
+_INT64 = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+
+# Value tags
+_NONE, _FALSE, _TRUE, _INTEGER, _FLOAT_TAG, _STRING, _LIST, _DICT = range(8)
+
+
+class BinaryFormatError(Exception):
+    """Custom error for invalid or unsupported binary files."""
+    pass
+
+
+def _condition_state(node: ConditionBranchNode):
+    from ddesigner.conditional import expression_source
+
+    return expression_source(node.text)
+
+
+def _set_condition_state(node: ConditionBranchNode, source: str):
+    node._evaluator = compile_source(source)
+
+
+def _message_state(node: ShowMessageNode):
+    """Return the templates of all the languages.
+
+    Only available for the default parsers, since templates are
+    compiled from them.
+    """
+    if (not node.compile_templates
+            or node.parsers != ShowMessageNode.parsers):
+        return None
+
+    node.compile()
+    return {language: [[text.format_string, list(text.names)],
+                       [[choice.format_string, list(choice.names)]
+                        for choice in choices]]
+            for language, (text, choices) in node._templates.items()}
+
+
+def _set_message_state(node: ShowMessageNode, state: dict):
+    if (not node.compile_templates
+            or node.parsers != ShowMessageNode.parsers):
+        return
+
+    node._templates = {
+        language: (TextTemplate.from_format_string(*text),
+                   tuple(TextTemplate.from_format_string(*choice)
+                         for choice in choices))
+        for language, (text, choices) in state.items()}
+    node._templates_parsers = tuple(node.parsers)
+
+
+# Precomputed state of the nodes, by class (subclasses included). For
+# each class, a pair of functions: the first returns the state of a
+# node (encodable, see _encode), or None. The second one restores the
+# state on a newly loaded node.
+PRECOMPILERS = {
+    ConditionBranchNode: (_condition_state, _set_condition_state),
+    ShowMessageNode: (_message_state, _set_message_state),
+}
+
+
+def _precompiler(node_class: type):
+    for base in node_class.__mro__:
+        if base in PRECOMPILERS:
+            return PRECOMPILERS[base]
+
+    return None
+
+
+class _Writer:
+    """Accumulate the strings and the values of a binary file."""
+
+    def __init__(self):
+        self.strings = {}
+        self.values = bytearray()
+
+    def string(self, string: str) -> int:
+        """Return the id of a string, adding it to the table if needed."""
+        return self.strings.setdefault(string, len(self.strings))
+
+    def add(self, value) -> int:
+        """Encode a value and return its position in self.values."""
+        position = len(self.values)
+        self._encode(value)
+        return position
+
+    def _encode(self, value):
+        """Append a value to self.values.
+
+        A value is a tag (byte) followed by: nothing (None and
+        booleans), an int64 (int), a double (float), a string id (str),
+        the length and the items (list and tuple, decoded as list) or
+        the length and the key, value pairs (dict).
+        """
+        values = self.values
+        if value is None:
+            values.append(_NONE)
+        elif value is True or value is False:
+            values.append(_TRUE if value else _FALSE)
+        elif isinstance(value, int):
+            values.append(_INTEGER)
+            values += _INT64.pack(value)
+        elif isinstance(value, float):
+            values.append(_FLOAT_TAG)
+            values += _FLOAT.pack(value)
+        elif isinstance(value, str):
+            values.append(_STRING)
+            values += _UINT.pack(self.string(value))
+        elif isinstance(value, (list, tuple)):
+            values.append(_LIST)
+            values += _UINT.pack(len(value))
+            for item in value:
+                self._encode(item)
+        elif isinstance(value, Mapping):
+            values.append(_DICT)
+            values += _UINT.pack(len(value))
+            for key, item in value.items():
+                self._encode(key)
+                self._encode(item)
+        else:
+            raise BinaryFormatError(
+                f'Unsupported value of type {type(value).__name__}')
+
+
+def dumps(data: DialogueData) -> bytes:
+    """Return the binary representation of the data (see write)."""
+    writer = _Writer()
+    classes = {}
+    records = bytearray()
+
+    for node in data.node_list:
+        node_class = type(node)
+        class_name = f'{node_class.__module__}:{node_class.__qualname__}'
+        arguments = {attr.name: getattr(node, attr.name)
+                     for attr in fields(node) if attr.init}
+        state_offset = NO_VALUE
+        precompiler = _precompiler(node_class)
+        if precompiler is not None:
+            state = precompiler[0](node)
+            if state is not None:
+                state_offset = writer.add(state)
+
+        records += RECORD.pack(
+            writer.string(node.node_name),
+            classes.setdefault(class_name, len(classes)),
+            writer.add(arguments), state_offset)
+
+    metadata = writer.add([list(classes), dict(data.variables)])
+
+    # Layout: header, string table, records, values
+    encoded = [string.encode() for string in writer.strings]
+    string_offsets = [0]
+    for string in encoded:
+        string_offsets.append(string_offsets[-1] + len(string))
+
+    strings_offset = HEADER.size
+    records_offset = (strings_offset + _UINT.size * len(string_offsets)
+                      + string_offsets[-1])
+    values_offset = records_offset + len(records)
+
+    return b''.join((
+        HEADER.pack(MAGIC, VERSION, len(encoded), len(data.nodes),
+                    strings_offset, records_offset, values_offset,
+                    metadata),
+        struct.pack(f'<{len(string_offsets)}I', *string_offsets),
+        *encoded, records, writer.values))
+
+
+def write(data: DialogueData, file: Union[BinaryIO, str, os.PathLike]):
+    """Write the data in binary form to a binary file or a path.
+
+    See the module documentation for the format. Node arguments and
+    variables can be None, booleans, integers, floats, strings, lists,
+    tuples and mappings (with the same rules for their items).
+    Conditions and message templates are precompiled (see
+    PRECOMPILERS), all the nodes of the data are built.
+    """
+    content = dumps(data)
+
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'wb') as opened_file:
+            opened_file.write(content)
+    else:
+        file.write(content)
+
+
+def _import_class(class_name: str) -> type:
+    module_name, qualname = class_name.split(':')
+    value = importlib.import_module(module_name)
+    for name in qualname.split('.'):
+        value = getattr(value, name)
+
+    return value
+
+
+class BinaryReader:
+    """Decoder of the binary format, over a buffer (eg. a mmap).
+
+    Strings are decoded once, on first use. See load.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        if len(buffer) < HEADER.size:
+            raise BinaryFormatError('Not a binary dialogue file')
+
+        (magic, version, string_count, self.node_count, self._strings_offset,
+         self._records_offset, self._values_offset,
+         metadata) = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise BinaryFormatError('Not a binary dialogue file')
+        if version != VERSION:
+            raise BinaryFormatError(f'Unsupported version {version}')
+
+        self._string_data_offset = (self._strings_offset
+                                    + _UINT.size * (string_count + 1))
+        self._strings = [None] * string_count
+
+        class_names, self.variables = self.value(metadata)
+        self.classes = [_import_class(name) for name in class_names]
+
+    def string(self, string_id: int) -> str:
+        """Return the string having the given id."""
+        string = self._strings[string_id]
+        if string is None:
+            start, end = struct.unpack_from(
+                '<II', self.buffer,
+                self._strings_offset + _UINT.size * string_id)
+            offset = self._string_data_offset
+            string = str(self.buffer[offset + start:offset + end], 'utf-8')
+            self._strings[string_id] = string
+
+        return string
+
+    def value(self, offset: int):
+        """Return the value at the given offset (see _Writer._encode)."""
+        return self._decode(self._values_offset + offset)[0]
+
+    def _decode(self, position: int) -> tuple:
+        """Return the value at the given position and the next position."""
+        buffer = self.buffer
+        tag = buffer[position]
+        position += 1
+
+        if tag == _NONE:
+            return None, position
+        if tag == _FALSE:
+            return False, position
+        if tag == _TRUE:
+            return True, position
+        if tag == _INTEGER:
+            return _INT64.unpack_from(buffer, position)[0], position + 8
+        if tag == _FLOAT_TAG:
+            return _FLOAT.unpack_from(buffer, position)[0], position + 8
+        if tag == _STRING:
+            string_id, = _UINT.unpack_from(buffer, position)
+            return self.string(string_id), position + _UINT.size
+
+        length, = _UINT.unpack_from(buffer, position)
+        position += _UINT.size
+        if tag == _LIST:
+            items = []
+            for _ in range(length):
+                item, position = self._decode(position)
+                items.append(item)
+
+            return items, position
+        if tag == _DICT:
+            items = {}
+            for _ in range(length):
+                key, position = self._decode(position)
+                items[key], position = self._decode(position)
+
+            return items, position
+
+        raise BinaryFormatError(f'Unknown value tag {tag}')
+
+    def record(self, index: int) -> tuple:
+        """Return the record of a node (see RECORD)."""
+        if not 0 <= index < self.node_count:
+            raise IndexError('node index out of range')
+
+        return RECORD.unpack_from(self.buffer,
+                                  self._records_offset + RECORD.size * index)
+
+    def name(self, index: int) -> str:
+        """Return the name of a node."""
+        return self.string(self.record(index)[0])
+
+    def node(self, index: int) -> Node:
+        """Decode and return a new instance of a node."""
+        _, class_index, arguments, state = self.record(index)
+        node_class = self.classes[class_index]
+        node = node_class(**self.value(arguments))
+
+        if state != NO_VALUE:
+            precompiler = _precompiler(node_class)
+            if precompiler is not None:
+                precompiler[1](node, self.value(state))
+
+        return node
+
+
+def loads(buffer) -> DialogueData:
+    """Return a lazy DialogueData from a binary buffer (see load)."""
+    reader = BinaryReader(buffer)
+    names = [reader.name(index) for index in range(reader.node_count)]
+
+    return DialogueData(LazyNodes(names, reader.node), reader.variables)
+
+
+def load(file: Union[BinaryIO, str, os.PathLike]) -> DialogueData:
+    """Load a binary file (see write), from a binary file or a path.
+
+    The file is memory mapped: the returned data is lazy (see
+    LazyNodes), nodes are decoded on first access. The mapping stays
+    open as long as the data exists. Precompiled conditions and
+    templates are restored (see PRECOMPILERS).
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as opened_file:
+            return load(opened_file)
+
+    return loads(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
@@ -0,0 +1,207 @@
+"""Cache of loaded dialogues, keyed by the content of the exports.
+
+See LoadCache.
+"""
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from typing import TextIO, BinaryIO, Callable, Union
+
+import ddesigner
+from ddesigner import default_model
+from ddesigner.model import *
+
+# Change to invalidate the caches on disk (eg. when the node classes
+# change in incompatible ways)
+CACHE_VERSION = 2
+
+
+def _pickle_dump(data: DialogueData, path: str):
+    with open(path, 'wb') as file:
+        pickle.dump(data, file, pickle.HIGHEST_PROTOCOL)
+
+
+def _pickle_load(path: str) -> DialogueData:
+    with open(path, 'rb') as file:
+        return pickle.load(file)
+
+
+def _binary_dump(data: DialogueData, path: str):
+    from ddesigner import binary
+
+    binary.write(data, path)
+
+
+def _binary_load(path: str) -> DialogueData:
+    from ddesigner import binary
+
+    return binary.load(path)
+
+
+# Formats of the caches on disk: file extension, dump and load
+# functions. Binary caches are loaded lazily (see ddesigner.binary).
+DISK_FORMATS = {
+    'pickle': ('.pickle', _pickle_dump, _pickle_load),
+    'binary': ('.ddb', _binary_dump, _binary_load),
+}
+
+
+def node_map_fingerprint(node_map: Mapping[str, type]) -> bytes:
+    """Return a digest identifying a node map across processes.
+
+    Based on the node types and the names of the classes.
+    """
+    description = sorted(f'{node_type}={cls.__module__}:{cls.__qualname__}'
+                         for node_type, cls in node_map.items())
+    return hashlib.blake2b('\n'.join(description).encode(),
+                           digest_size=16).digest()
+
+
+class LoadCache:
+    """A bounded (LRU) cache of loaded DialogueData instances.
+
+    Data is keyed by the digest of the json content, by node map
+    (identity) and by the loading options (validate, compile and
+    lazy), so that loading an unchanged export again returns the
+    instance loaded the first time, with no decoding at all. The same
+    instance is shared by all the callers, so it's frozen when stored
+    (see DialogueData.freeze): all its nodes are built and compiled,
+    even if it was loaded lazily.
+
+    If directory is given, loaded data is also stored there (in the
+    given disk_format, see DISK_FORMATS), so that other processes (or
+    later runs) can skip decoding and building the nodes. Data on disk
+    is stored in full, even if it was loaded lazily. Only use trusted
+    directories (the files are unpickled or imported).
+
+    Thread safe.
+    """
+
+    def __init__(self, maxsize: int = 32, directory: str = None,
+                 disk_format: str = 'pickle'):
+        if disk_format not in DISK_FORMATS:
+            raise ValueError(f'Unknown disk format {disk_format!r}')
+
+        self.maxsize = maxsize
+        self.directory = directory
+        self.disk_format = disk_format
+        self.hits = 0
+        self.misses = 0
+
+        # {key: (node_map, data)}. The node map is kept so that its id
+        # (part of the key) can't be reused.
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Empty the cache (in memory) and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def from_json(self, json_str: Union[str, bytes],
+                  node_map=default_model.NODE_TYPE_MAP,
+                  validate: bool = False, compile: bool = False,
+                  decoder: Union[str, Callable] = None,
+                  lazy: bool = False) -> DialogueData:
+        """Same as ddesigner.from_json, through the cache."""
+        if isinstance(json_str, str):
+            content = json_str.encode()
+        else:
+            content = json_str
+
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        key = digest, id(node_map), validate, compile, lazy
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+
+        data = self._load_disk(digest, node_map, validate, compile)
+        if data is None:
+            data = ddesigner.from_json(json_str, node_map, validate, compile,
+                                       decoder, lazy)
+            self._store_disk(digest, node_map, data)
+
+        data.freeze()
+        with self._lock:
+            self._entries[key] = node_map, data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return data
+
+    def from_file(self, file: Union[TextIO, BinaryIO, str, os.PathLike],
+                  node_map=default_model.NODE_TYPE_MAP,
+                  validate: bool = False, compile: bool = False,
+                  decoder: Union[str, Callable] = None,
+                  lazy: bool = False) -> DialogueData:
+        """Same as ddesigner.from_file, through the cache.
+
+        The whole file is read (and hashed) each time.
+        """
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, 'rb') as opened_file:
+                content = opened_file.read()
+        else:
+            content = file.read()
+
+        return self.from_json(content, node_map, validate, compile,
+                              decoder, lazy)
+
+    def _disk_path(self, digest: bytes, node_map) -> str:
+        extension = DISK_FORMATS[self.disk_format][0]
+        name = hashlib.blake2b(
+            b'%d:%s:%s' % (CACHE_VERSION, digest,
+                           node_map_fingerprint(node_map)),
+            digest_size=16).hexdigest()
+
+        return os.path.join(self.directory, name + extension)
+
+    def _load_disk(self, digest: bytes, node_map, validate: bool,
+                   compile: bool) -> DialogueData:
+        """Return the data stored on disk, or None."""
+        if self.directory is None:
+            return None
+
+        path = self._disk_path(digest, node_map)
+        if not os.path.exists(path):
+            return None
+
+        data = DISK_FORMATS[self.disk_format][2](path)
+        if validate:
+            data.validate()
+        if compile:
+            data.compile()
+
+        return data
+
+    def _store_disk(self, digest: bytes, node_map, data: DialogueData):
+        """Store the data on disk, atomically."""
+        if self.directory is None:
+            return
+
+        path = self._disk_path(digest, node_map)
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        os.close(descriptor)
+        try:
+            DISK_FORMATS[self.disk_format][1](data, temporary_path)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
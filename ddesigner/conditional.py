@@ -1,12 +1,19 @@
 """Module containing the logic for an arithmetic parser.
 
-Lark is used as a parser generator.
+Lark is used as a parser generator. The default parser uses the LALR
+algorithm, the grammar analysis can be cached on disk (see
+make_parser). The default parser is built lazily, the first time an
+expression is parsed (see get_default_parser).
 """
-from typing import Mapping
+from typing import Mapping, Callable, Union
+import functools
 import operator
+import math
 
 import lark
 
+from ddesigner.expressions import compile_source
+
 # Default syntax for arithmetic expressions
 ARITHM_EXPRESSIONS_SYNTAX = """
 ?start: or
@@ -108,17 +115,310 @@ class ArithmExpressionTransformer(lark.Transformer):
         return self.variables[name]
 
 
-# Default parser for arithmetic expressions (using the default syntax)
-ARITHM_EXPRESSIONS_PARSER = lark.Lark(ARITHM_EXPRESSIONS_SYNTAX)
+class ArithmExpressionInterpreter(lark.visitors.Interpreter):
+    """Interpreter used to calculate the result of arithmetic exp.
+
+    Differently from ArithmExpressionTransformer, the tree is visited
+    top-down and subtrees are only visited when needed: boolean
+    operators provide short circuiting. All the other operations are
+    delegated to an ArithmExpressionTransformer.
+    """
+
+    def __init__(self, variables):
+        self.variables = variables
+        self.transformer = ArithmExpressionTransformer(variables)
+
+    def transform(self, tree: lark.Tree):
+        """Return the value of the tree (same as self.visit).
+
+        Provided for compatibility with lark.Transformer.
+        """
+        return self.visit(tree)
+
+    def and_(self, tree):
+        """Boolean and, with short circuiting."""
+        x, y = tree.children
+        return self.visit(x) and self.visit(y)
+
+    def or_(self, tree):
+        """Boolean or, with short circuiting."""
+        x, y = tree.children
+        return self.visit(x) or self.visit(y)
+
+    def __default__(self, tree):
+        return getattr(self.transformer, tree.data)(
+            *self.visit_children(tree))
+
+
+def _binary_operation(symbol: str):
+    """Return a compiler method emitting a python binary operation."""
+    def operation(self, x, y):
+        return f'({x} {symbol} {y})'
+
+    return operation
+
+
+@lark.v_args(inline=True)
+class ArithmExpressionCompiler(lark.Transformer):
+    """Transformer used to translate arithmetic exp. into python code.
+
+    The result of the transformation is a string containing a python
+    expression equivalent to the given arithmetic expression. Free
+    variables are looked up in a mapping called "variables".
+    """
+    add = _binary_operation('+')
+    sub = _binary_operation('-')
+    mul = _binary_operation('*')
+    div = _binary_operation('/')
+    floordiv = _binary_operation('//')
+    lt = _binary_operation('<')
+    gt = _binary_operation('>')
+    lte = _binary_operation('<=')
+    gte = _binary_operation('>=')
+    eq = _binary_operation('==')
+    neq = _binary_operation('!=')
+
+    def and_(self, x, y):
+        """Boolean and, with short circuiting."""
+        return f'({x} and {y})'
+
+    def or_(self, x, y):
+        """Boolean or, with short circuiting."""
+        return f'({x} or {y})'
+
+    def neg(self, x):
+        return f'(-{x})'
+
+    def not_(self, x):
+        return f'(not {x})'
+
+    def number(self, number):
+        value = float(number)
+        if math.isfinite(value):
+            return repr(value)
+
+        return f'float({str(number)!r})'
+
+    def string(self, string: str):
+        return repr(string.strip('"'))
+
+    def true(self):
+        return 'True'
+
+    def false(self):
+        return 'False'
+
+    def var(self, name):
+        return f'variables[{str(name)!r}]'
+
+
+@lark.v_args(inline=True)
+class ArithmExpressionVectorCompiler(ArithmExpressionCompiler):
+    """Compiler translating arithmetic exp. into vectorized python code.
+
+    Same as ArithmExpressionCompiler, but boolean operators are
+    element-wise numpy operations, so that variables can be arrays (see
+    compile_vectorized_expression). As in python, "and" and "or"
+    return one of their operands.
+    """
+
+    def and_(self, x, y):
+        """Element-wise boolean and (no short circuiting)."""
+        return f'_np.where(_truthy({x}), {y}, {x})'
+
+    def or_(self, x, y):
+        """Element-wise boolean or (no short circuiting)."""
+        return f'_np.where(_truthy({x}), {x}, {y})'
+
+    def not_(self, x):
+        return f'_np.logical_not(_truthy({x}))'
+
+
+# Maximum number of compiled expressions kept in memory
+COMPILED_EXPRESSIONS_CACHE_SIZE = 1024
+
+
+def make_parser(syntax: str = ARITHM_EXPRESSIONS_SYNTAX,
+                parser: str = 'lalr',
+                cache: Union[bool, str] = False) -> lark.Lark:
+    """Build and return a parser for arithmetic expressions.
+
+    Any parsing algorithm supported by lark can be given ('lalr' or
+    'earley'), the default syntax is unambiguous and works for both.
+
+    "cache" is only supported by LALR parsers. If True, the analysis
+    of the grammar is cached in a temporary file and reused by
+    subsequent processes. If a path is given, the analysis is cached
+    there instead: such file can be pre-generated and shipped, so that
+    the grammar never needs to be rebuilt at runtime. The cache is
+    invalidated automatically if the grammar or lark's version changes.
+    """
+    return lark.Lark(syntax, parser=parser, cache=cache)
+
+
+# Default parser for arithmetic expressions (using the default syntax).
+# Built on first use, access it through get_default_parser.
+_default_parser: lark.Lark = None
+
+
+def get_default_parser() -> lark.Lark:
+    """Return the default parser, building it if necessary."""
+    global _default_parser
+
+    if _default_parser is None:
+        _default_parser = make_parser()
+
+    return _default_parser
+
+
+def set_default_parser(parser: lark.Lark):
+    """Replace the default parser.
+
+    Useful to install a parser built with custom options (eg. a cached
+    one, see make_parser) before any expression is evaluated, so that
+    the default one is never built.
+    """
+    global _default_parser
+    _default_parser = parser
+
+
+def __getattr__(name):
+    """Lazily provide ARITHM_EXPRESSIONS_PARSER (default parser)."""
+    if name == 'ARITHM_EXPRESSIONS_PARSER':
+        return get_default_parser()
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def arithm_expression_evaluate(
     expression: str, variables: Mapping,
-    parser: lark.Lark = ARITHM_EXPRESSIONS_PARSER,
-        transformer: lark.Transformer = ArithmExpressionTransformer):
+    parser: lark.Lark = None,
+        transformer: lark.Transformer = ArithmExpressionInterpreter):
     """Return the value of the given expression.
 
     Free variable names will be calculated using the 'variables'
-    mapping.
+    mapping. If no parser is given, the default one is used.
+
+    By default, boolean operators are short circuited (variables in
+    unreached subexpressions are not looked up). Pass
+    ArithmExpressionTransformer as transformer to evaluate all the
+    subexpressions instead.
     """
+    if parser is None:
+        parser = get_default_parser()
+
     return transformer(variables).transform(parser.parse(expression))
+
+
+@functools.lru_cache(maxsize=COMPILED_EXPRESSIONS_CACHE_SIZE)
+def compile_expression(
+    expression: str,
+        parser: lark.Lark = None) -> Callable:
+    """Compile the given expression and return an evaluator for it.
+
+    The returned evaluator is a callable accepting a mapping of
+    variables and returning the value of the expression, equivalently
+    to arithm_expression_evaluate. Parsing happens only once: the
+    expression is translated into python code by
+    ArithmExpressionCompiler and compiled to a function.
+
+    Results are cached (LRU) by expression string, so compiling the
+    same expression multiple times is cheap. If no parser is given,
+    the default one is used.
+    """
+    return compile_source(expression_source(expression, parser))
+
+
+def expression_source(expression: str, parser: lark.Lark = None) -> str:
+    """Return the python source equivalent to the given expression.
+
+    See ArithmExpressionCompiler. The source can be turned into an
+    evaluator by compile_source, with no need for parsing (eg. it can
+    be stored and compiled later). If no parser is given, the default
+    one is used.
+    """
+    if parser is None:
+        parser = get_default_parser()
+
+    return ArithmExpressionCompiler().transform(parser.parse(expression))
+
+
+@functools.lru_cache(maxsize=COMPILED_EXPRESSIONS_CACHE_SIZE)
+def compile_vectorized_expression(
+    expression: str,
+        parser: lark.Lark = None) -> Callable:
+    """Compile the given expression into a vectorized evaluator.
+
+    Requires numpy. The returned evaluator accepts a mapping of
+    columns (variable names to numpy arrays, all of the same length)
+    and returns the value of the expression for each element, as
+    an array (or as a scalar, if no variables are used). See
+    ArithmExpressionVectorCompiler for the differences with
+    compile_expression. Numerical errors (eg. division by zero) follow
+    numpy's rules (see vectorized_expression_evaluate).
+
+    Results are cached (LRU) by expression string. If no parser is
+    given, the default one is used.
+    """
+    import numpy
+
+    if parser is None:
+        parser = get_default_parser()
+
+    source = ArithmExpressionVectorCompiler().transform(
+        parser.parse(expression))
+
+    return compile_source(source, {'_np': numpy, '_truthy': truthy})
+
+
+def truthy(value):
+    """Return the truth value of each element of a numpy array.
+
+    Same as bool(element), strings included. Scalars are accepted as
+    well. The result is a boolean array.
+    """
+    import numpy
+
+    value = numpy.asarray(value)
+    if value.dtype.kind in 'US':
+        return numpy.char.str_len(value) > 0
+
+    return value.astype(bool)
+
+
+def vectorized_expression_evaluate(expression: str, columns: Mapping,
+                                   size: int = None,
+                                   parser: lark.Lark = None):
+    """Return the truth value of the expression for each element.
+
+    The result is a boolean numpy array. Free variable names are
+    looked up in "columns", a mapping of numpy arrays. The length of
+    the result is given by "size" if given, otherwise it is the length
+    of the columns (an empty mapping requires size). See
+    compile_vectorized_expression.
+
+    Invalid operations (eg. division by zero) raise a
+    FloatingPointError, where the scalar evaluation (see
+    compile_expression) raises an error of its own.
+    """
+    import numpy
+
+    if size is None:
+        size = len(next(iter(columns.values())))
+
+    with numpy.errstate(divide='raise', invalid='raise'):
+        value = compile_vectorized_expression(expression, parser)(columns)
+
+    return numpy.broadcast_to(truthy(value), size)
+
+
+def expression_variables(expression: str, parser: lark.Lark = None) -> set:
+    """Return the set of variable names used in the given expression.
+
+    If no parser is given, the default one is used.
+    """
+    if parser is None:
+        parser = get_default_parser()
+
+    return {str(tree.children[0])
+            for tree in parser.parse(expression).find_data('var')}
@@ -1,11 +1,11 @@
 """Default model implementation for the current DD version."""
 from dataclasses import *
 from typing import ClassVar, Any, Callable, Sequence
+import functools
 import random
 import enum
 import re
 
-from ddesigner.conditional import arithm_expression_evaluate
 from ddesigner.model import *
 
 
@@ -15,6 +15,125 @@ RE_VARIABLES_TEXT_PARSER = re.compile(r'\${([^{}]*)}')
 DEFAULT_LANGUAGE = 'ENG'
 
 
+class TextTemplate:
+    """A text split in literal segments and variable slots.
+
+    Rendering a template with a mapping of variables is equivalent to
+    parsing its original string with variables_text_parser, but no
+    pattern recognition is performed at rendering time.
+    """
+    __slots__ = ('names', '_format_string')
+
+    def __init__(self, literals: Sequence[str], names: Sequence[str]):
+        """Build a template from its segments.
+
+        literals and names are interleaved: literals[0], names[0],
+        literals[1], ... so there must be one more literal than names.
+        """
+        self.names = tuple(names)
+        self._format_string = '{!s}'.join(
+            literal.replace('{', '{{').replace('}', '}}')
+            for literal in literals)
+
+    @classmethod
+    def from_string(cls, string: str) -> 'TextTemplate':
+        """Build a template from a string containing ${var} patterns."""
+        segments = RE_VARIABLES_TEXT_PARSER.split(string)
+        return cls(segments[::2], segments[1::2])
+
+    @classmethod
+    def from_format_string(cls, format_string: str,
+                           names: Sequence[str]) -> 'TextTemplate':
+        """Build a template from a format string (see format_string)."""
+        template = cls.__new__(cls)
+        template.names = tuple(names)
+        template._format_string = format_string
+        return template
+
+    @property
+    def format_string(self) -> str:
+        """Format string of the template (see str.format).
+
+        Contains a positional field for each name in self.names.
+        """
+        return self._format_string
+
+    def render(self, variables: Mapping = {}) -> str:
+        """Substitute the variables and return the resulting string.
+
+        Missing variables are replaced by their names.
+        """
+        return self._format_string.format(
+            *[variables.get(name, name) for name in self.names])
+
+    def render_values(self, values: Sequence) -> str:
+        """Render the template given the values of self.names."""
+        return self._format_string.format(*values)
+
+
+class RenderCache:
+    """A bounded (LRU) cache of rendered templates.
+
+    Renderings are keyed by template and by the values (and their
+    types) of the variables referenced by the template, so that
+    identical renderings are only computed once. Renderings depending on
+    unhashable values are not cached.
+
+    See ShowMessageNode.render_cache.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._render = functools.lru_cache(maxsize)(self._render_values)
+
+    @staticmethod
+    def _render_values(template: TextTemplate, values: tuple,
+                       types: tuple) -> str:
+        return template.render_values(values)
+
+    def render(self, template: TextTemplate, variables: Mapping = {}) -> str:
+        """Return the rendering of template (see TextTemplate.render)."""
+        values = tuple([variables.get(name, name) for name in template.names])
+
+        try:
+            return self._render(template, values, tuple(map(type, values)))
+        except TypeError:
+            # Unhashable values
+            return template.render_values(values)
+
+    @property
+    def hits(self) -> int:
+        """Number of renderings served from the cache."""
+        return self._render.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+        """Number of renderings computed and cached."""
+        return self._render.cache_info().misses
+
+    def __len__(self):
+        return self._render.cache_info().currsize
+
+    def clear(self):
+        """Empty the cache and reset the counters."""
+        self._render.cache_clear()
+
+
+def _intern_keys(mapping: dict) -> dict:
+    """Return a copy of mapping having interned keys (see intern)."""
+    return {intern(key): value for key, value in mapping.items()}
+
+
+def static_parser(parser: Callable) -> Callable:
+    """Decorator marking a text parser as static.
+
+    The output of a static parser only depends on the given string and
+    language (not on the variables), so it can be applied once
+    when text templates are compiled (see ShowMessageNode).
+    """
+    parser.static = True
+    return parser
+
+
 def apply_parsers(parsers: Sequence[Callable], string: str, language: str,
                   variables: Mapping = {}) -> str:
     """Apply given list of parsers to a string.
@@ -34,20 +153,23 @@ def variables_text_parser(string, language, variables) -> str:
     The pattern ${var} gets replaced by variables[var]. Usage of curly
     brackets inside the varname (eg. ${var{0}}) is forbidden.
 
-    Recognition/substitution is done through regexes.
+    Recognition/substitution is done through regexes, in a single
+    pass (substituted values are never parsed again).
     """
-    matches = RE_VARIABLES_TEXT_PARSER.findall(string)
-
-    for match in matches:
+    def replace(match):
         # If the variable is not found, replace with the name of the
         # variable.
-        string = RE_VARIABLES_TEXT_PARSER.sub(
-            str(variables.get(match, match)), string, count=1)
+        name = match[1]
+        return str(variables.get(name, name))
 
-    return string
+    return RE_VARIABLES_TEXT_PARSER.sub(replace, string)
 
 
-@dataclass
+# variables_text_parser's work can be done by a TextTemplate
+variables_text_parser.compile_template = TextTemplate.from_string
+
+
+@dataclass(slots=True)
 class ShowMessageNode(SimpleNode):
     """Node used for the "show_message" type.
 
@@ -67,28 +189,98 @@ class ShowMessageNode(SimpleNode):
 
     By default, one parser is present: variables_text_parser(...) (see
     its documentation for details).
+
+    Texts are compiled into templates (see TextTemplate) the first time
+    they are rendered in a language, and cached on the node. This is
+    only possible if "parsers" consists of any number of static parsers
+    (see static_parser) optionally followed by a single parser having a
+    "compile_template" attribute: a callable accepting a string and
+    returning a TextTemplate (eg. variables_text_parser). Otherwise
+    (or if compile_templates is False) parsers are applied to the
+    text each time. Templates are compiled again if "parsers" is
+    modified after texts are rendered.
+
+    Compiled templates can be rendered through a RenderCache, by
+    setting render_cache (eg. ShowMessageNode.render_cache =
+    RenderCache()). Disabled by default.
+
+    character and choices are stored as tuples. Language codes and
+    character names are interned.
     """
-    character: list = field(default_factory=lambda: ['', 0])
+    character: tuple = ('', 0)
     file: str = ''
     is_box: bool = False
     object_path: str = ''
     slide_camera: bool = True
     speaker_type: int = 0
     text: dict = field(default_factory=lambda: {'ENG': ''})
-    choices: list = field(default_factory=lambda: [])
+    choices: tuple = ()
+
+    _choices_next: tuple = field(default=None, init=False, repr=False,
+                                 compare=False)
+    # Compiled templates, in the form:
+    # {language: (text_template, (choice_template, ...))}
+    _templates: dict = field(default=None, init=False, repr=False,
+                             compare=False)
+    # Parsers the templates were compiled with
+    _templates_parsers: tuple = field(default=None, init=False,
+                                      repr=False, compare=False)
 
     blocking: ClassVar = Blocking.BLOCKING
 
     # Optional list of callables, used to parse the string in the node
     # in various ways.
     parsers: ClassVar[list[Callable]] = [variables_text_parser]
+    # Set to False to disable template compilation
+    compile_templates: ClassVar[bool] = True
+    # Optional cache for rendered templates
+    render_cache: ClassVar[RenderCache] = None
+
+    def __post_init__(self):
+        super(ShowMessageNode, self).__post_init__()
+
+        self.character = tuple(map(intern, self.character))
+        self.text = _intern_keys(self.text)
+        self.choices = tuple({**choice, 'text': _intern_keys(choice['text'])}
+                             if 'text' in choice else choice
+                             for choice in self.choices)
 
     def _compute(self, variables, choice: int = None):
         """Simply go to next. TODO: support choices."""
         if choice is not None:
+            if self._choices_next is not None:
+                return self._choices_next[choice]
+
             return self.choices[choice]['next']
 
-        return super()._compute(variables)
+        return super(ShowMessageNode, self)._compute(variables)
+
+    def successors(self) -> Iterable[str]:
+        return (self.next, *(choice['next'] for choice in self.choices))
+
+    def link(self, nodes: Mapping[str, Node]):
+        super(ShowMessageNode, self).link(nodes)
+        self._choices_next = tuple(nodes.get(choice['next'], choice['next'])
+                                   for choice in self.choices)
+
+    def validate(self, variables: Set[str]) -> list[str]:
+        """Report unknown variables used in texts (${var} patterns).
+
+        Only performed if variables_text_parser is in use.
+        """
+        if variables_text_parser not in self.parsers:
+            return []
+
+        texts = list(self.text.values())
+        for choice in self.choices:
+            texts.extend(choice['text'].values())
+
+        names = set()
+        for text in texts:
+            names.update(RE_VARIABLES_TEXT_PARSER.findall(text))
+
+        return [f'unknown variable {name!r} in text'
+                for name in sorted(names - variables)]
 
     def parse_text(self, language: str = DEFAULT_LANGUAGE,
                    variables: Mapping = {}) -> str:
@@ -106,6 +298,10 @@ class ShowMessageNode(SimpleNode):
         mapping being passed to all the parsers (eg. useful for
         substitutions).
         """
+        templates = self.get_templates(language)
+        if templates is not None:
+            return self._render(templates[0], variables)
+
         # Fallback on default language if neeeded, fallback on empty
         # string if no language is found
         text = self.text.get(language, self.text.get(DEFAULT_LANGUAGE, ''))
@@ -118,6 +314,11 @@ class ShowMessageNode(SimpleNode):
         The returned list is localized (if the language is available)
         and parsed.
         """
+        templates = self.get_templates(language)
+        if templates is not None:
+            return [self._render(template, variables)
+                    for template in templates[1]]
+
         # Could be done with some list comprehension magic but I
         # unwrapped it to be more clear
         res = []
@@ -129,16 +330,79 @@ class ShowMessageNode(SimpleNode):
             res.append(apply_parsers(self.parsers, text, language, variables))
         return res
 
+    def get_templates(self, language: str = DEFAULT_LANGUAGE) -> tuple:
+        """Return the compiled templates for the given language.
+
+        The result is a tuple in the form:
+        (text_template, (choice_template, ...))
+        Templates are compiled on the first request, and again if
+        "parsers" changed since. If templates can't be compiled (see
+        class documentation), None is returned.
+        """
+        parsers = tuple(self.parsers)
+        if self._templates is None or self._templates_parsers != parsers:
+            self._templates = {}
+            self._templates_parsers = parsers
+
+        templates = self._templates.get(language)
+        if templates is not None or not self.compile_templates:
+            return templates
+
+        # Find out if the parsers can be compiled
+        static_parsers = list(parsers)
+        compiler = None
+        if static_parsers and hasattr(static_parsers[-1], 'compile_template'):
+            compiler = static_parsers.pop().compile_template
+
+        if not all(getattr(parser, 'static', False)
+                   for parser in static_parsers):
+            return None
+
+        def compile_template(text):
+            # Fallback on default language if neeeded, fallback on empty
+            # string if no language is found
+            text = text.get(language, text.get(DEFAULT_LANGUAGE, ''))
+            text = apply_parsers(static_parsers, text, language)
+
+            if compiler is None:
+                return TextTemplate((text,), ())
+            return compiler(text)
+
+        templates = (compile_template(self.text),
+                     tuple(compile_template(choice['text'])
+                           for choice in self.choices))
+        self._templates[language] = templates
+
+        return templates
+
+    def _render(self, template: TextTemplate, variables: Mapping) -> str:
+        """Render a template, through the render cache if any."""
+        if self.render_cache is None:
+            return template.render(variables)
+
+        return self.render_cache.render(template, variables)
+
+    def clear_templates(self):
+        """Discard the compiled templates."""
+        self._templates = None
+
+    def compile(self):
+        """Compile the templates of all the available languages."""
+        for language in self.text:
+            self.get_templates(language)
+
 
 class RandomNode(Node):
     """Abstract class for a Node based on a random generation.
 
     The random generator is kept in the RandomNode.rand attribute.
     """
+    __slots__ = ()
+
     rand = random
 
 
-@dataclass
+@dataclass(slots=True)
 class RandomBranchNode(RandomNode):
     """Node used for the "random_branch" type.
 
@@ -148,14 +412,23 @@ class RandomBranchNode(RandomNode):
     branches: dict = field(default_factory=lambda: {'1': None})
     possibilities: int = 2
 
+    _branches: tuple = field(default=None, init=False, repr=False,
+                             compare=False)
+
     def _compute(self, variables):
         """Choose randomly between the given branches."""
-        return self.rand.choice(
-            [branch for key, branch in self.branches.items()
-             if int(key) <= self.possibilities])
+        return self.rand.choice(self._branches or self.successors())
+
+    def successors(self) -> list[str]:
+        return [branch for key, branch in self.branches.items()
+                if int(key) <= self.possibilities]
+
+    def link(self, nodes: Mapping[str, Node]):
+        self._branches = tuple(nodes.get(branch, branch)
+                               for branch in self.successors())
 
 
-@dataclass
+@dataclass(slots=True)
 class ChanceBranchNode(RandomNode):
     """Node used for the "chance_branch" type.
 
@@ -166,12 +439,22 @@ class ChanceBranchNode(RandomNode):
     chance_1: int = 0
     chance_2: int = 100
 
+    _branches: tuple = field(default=None, init=False, repr=False,
+                             compare=False)
+
     def _compute(self, variables):
         """Choose one of the two branches."""
         chance_tup = self.chance_1, self.chance_2
-        branches_tup = self.branches['1'], self.branches['2']
+        branches_tup = self._branches or self.successors()
         return self.rand.choices(branches_tup, weights=chance_tup)[0]
 
+    def successors(self) -> tuple[str, str]:
+        return self.branches['1'], self.branches['2']
+
+    def link(self, nodes: Mapping[str, Node]):
+        self._branches = tuple(nodes.get(branch, branch)
+                               for branch in self.successors())
+
 
 class OperationType(enum.Enum):
     """Supported operation types for SetVariableNodes."""
@@ -180,7 +463,7 @@ class OperationType(enum.Enum):
     SUBTRACT = "SUBSTRACT"
 
 
-@dataclass
+@dataclass(slots=True)
 class SetVariableNode(SimpleNode):
     """Node used for the "set_local_variable" type.
 
@@ -192,6 +475,12 @@ class SetVariableNode(SimpleNode):
     toggle: bool = None
     operation_type: str = "SET"
 
+    def __post_init__(self):
+        super(SetVariableNode, self).__post_init__()
+
+        self.var_name = intern(self.var_name)
+        self.operation_type = intern(self.operation_type)
+
     def _compute(self, variables):
         """Operate on the variables and return the next node."""
         # Check if it's a toggle
@@ -208,10 +497,13 @@ class SetVariableNode(SimpleNode):
 
         variables[self.var_name] = value
 
-        return super()._compute(variables)
+        return super(SetVariableNode, self)._compute(variables)
+
+    def assigned_variables(self) -> Iterable[str]:
+        return (self.var_name,)
 
 
-@dataclass
+@dataclass(slots=True)
 class WaitNode(SimpleNode):
     """Node used for the "wait" type.
 
@@ -222,7 +514,7 @@ class WaitNode(SimpleNode):
     blocking: ClassVar = Blocking.BLOCKING
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecuteNode(SimpleNode):
     """Node used for the "execute" type.
 
@@ -255,7 +547,7 @@ class ExecuteNode(SimpleNode):
     def _compute(self, variables):
         self._trigger_subscribers(variables)
 
-        return super()._compute(variables)
+        return super(ExecuteNode, self)._compute(variables)
 
     def _trigger_subscribers(self, variables):
         for sub in self.subscribers:
@@ -290,7 +582,7 @@ class ExecuteNode(SimpleNode):
         cls.subscribers.clear()
 
 
-@dataclass
+@dataclass(slots=True)
 class ConditionBranchNode(Node):
     """Node used for the "condition_branch" type.
 
@@ -299,16 +591,62 @@ class ConditionBranchNode(Node):
     The default implementation uses an arithmetcal parser to parse
     the given condition string, and uses the current variables' state to
     determine the truth value of the whole expression.
+
+    The condition is compiled (see ddesigner.conditional) the first
+    time the node is computed. The expression engine is only imported
+    at that point.
     """
     text: str = ''
     branches: dict = field(
         default_factory=lambda: {'True': None, 'False': None})
 
+    _evaluator: Callable = field(default=None, init=False, repr=False,
+                                 compare=False)
+    _branches: tuple = field(default=None, init=False, repr=False,
+                             compare=False)
+
+    def compile(self):
+        """Compile the condition, see ddesigner.conditional.
+
+        Called automatically when needed. If self.text is changed,
+        call it again to update the compiled condition.
+        """
+        from ddesigner.conditional import compile_expression
+
+        self._evaluator = compile_expression(self.text)
+
     def _compute(self, variables):
-        value = arithm_expression_evaluate(self.text, variables)
+        if self._evaluator is None:
+            self.compile()
+
+        value = self._evaluator(variables)
+
+        if self._branches is not None:
+            return self._branches[bool(value)]
 
         return self.branches[str(bool(value))]
 
+    def successors(self) -> tuple[str, str]:
+        return self.branches['False'], self.branches['True']
+
+    def link(self, nodes: Mapping[str, Node]):
+        self._branches = tuple(nodes.get(branch, branch)
+                               for branch in self.successors())
+
+    def validate(self, variables: Set[str]) -> list[str]:
+        """Report syntax errors and unknown variables in the condition."""
+        import lark
+        from ddesigner.conditional import expression_variables
+
+        try:
+            names = expression_variables(self.text)
+        except lark.exceptions.LarkError as error:
+            return [f'invalid condition {self.text!r}: '
+                    f'{str(error).splitlines()[0]}']
+
+        return [f'unknown variable {name!r} in condition'
+                for name in sorted(names - variables)]
+
 
 # Dictionary mapping type names to actual type classes
 NODE_TYPE_MAP = {
@@ -0,0 +1,26 @@
+"""Compilation of python sources translated from expressions.
+
+See ddesigner.conditional for the translation. This module doesn't
+depend on the expression engine (lark): precompiled sources (eg. from
+ddesigner.binary) can be compiled without importing it.
+"""
+from typing import Callable, Mapping
+
+# Names available to the compiled expressions (see compile_source)
+COMPILED_EXPRESSIONS_NAMESPACE = {'__builtins__': {'float': float}}
+
+
+def compile_source(source: str, namespace: Mapping = None) -> Callable:
+    """Return an evaluator for the given python source.
+
+    source must come from ddesigner.conditional.expression_source (or
+    ArithmExpressionVectorCompiler). See
+    ddesigner.conditional.compile_expression: the evaluator accepts a
+    mapping of variables. namespace holds names made available to the
+    source, in addition to COMPILED_EXPRESSIONS_NAMESPACE.
+    """
+    code = compile(f'lambda variables: {source}', '<expression>', 'eval')
+    if namespace is not None:
+        return eval(code, {**COMPILED_EXPRESSIONS_NAMESPACE, **namespace})
+
+    return eval(code, COMPILED_EXPRESSIONS_NAMESPACE)
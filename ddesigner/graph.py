@@ -0,0 +1,138 @@
+"""Graph algorithms over the nodes of a dialogue.
+
+Graphs are given as mappings from each vertex to its successors
+(iterables of vertices). Successors which are not keys of the mapping
+are ignored.
+
+DialogueGraph indexes the nodes of a DialogueData this way.
+"""
+from typing import Mapping, Iterable, Hashable
+
+from ddesigner.model import START_NODE_NAME
+
+
+def strongly_connected_components(
+        successors: Mapping[Hashable, Iterable]) -> list[list]:
+    """Return the strongly connected components of a directed graph.
+
+    Components are lists of vertices, returned in reverse topological
+    order: edges only go from a component to the previous ones (or to
+    itself). Uses an iterative version of Tarjan's algorithm, so
+    that it runs in O(V+E) with no recursion.
+    """
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    def visit(vertex):
+        index[vertex] = lowlink[vertex] = len(index)
+        stack.append(vertex)
+        on_stack.add(vertex)
+        work.append((vertex, iter(successors[vertex])))
+
+    for root in successors:
+        if root in index:
+            continue
+
+        work = []
+        visit(root)
+        while work:
+            vertex, children = work[-1]
+            for child in children:
+                if child not in successors:
+                    continue
+
+                if child not in index:
+                    visit(child)
+                    break
+
+                if child in on_stack:
+                    lowlink[vertex] = min(lowlink[vertex], index[child])
+            else:
+                # All the children are visited
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[vertex])
+
+                if lowlink[vertex] == index[vertex]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == vertex:
+                            break
+
+                    components.append(component)
+
+    return components
+
+
+def reachable(successors: Mapping[Hashable, Iterable],
+              roots: Iterable) -> set:
+    """Return the set of vertices reachable from the given roots.
+
+    Roots are included in the result, unless they are not vertices of
+    the graph. Runs in O(V+E).
+    """
+    found = {root for root in roots if root in successors}
+    stack = list(found)
+    while stack:
+        for child in successors[stack.pop()]:
+            if child in successors and child not in found:
+                found.add(child)
+                stack.append(child)
+
+    return found
+
+
+class DialogueGraph:
+    """Adjacency index of the nodes of a DialogueData.
+
+    Vertices are node names. self.successors maps each node to the
+    names of the nodes that may follow it (see Node.successors),
+    self.predecessors to the ones that may precede it. Ends of
+    branches (None) and successors missing from the data are left
+    out. The index is a snapshot: build a new one if the data changes.
+    """
+
+    def __init__(self, data):
+        self.successors = {}
+        self.predecessors = {name: [] for name in data.nodes}
+
+        for name, node in data.nodes.items():
+            successors = tuple(dict.fromkeys(
+                successor for successor in node.successors()
+                if successor in self.predecessors))
+            self.successors[name] = successors
+
+            for successor in successors:
+                self.predecessors[successor].append(name)
+
+    def strongly_connected_components(self) -> list[list[str]]:
+        """Return the strongly connected components of the nodes.
+
+        See strongly_connected_components.
+        """
+        return strongly_connected_components(self.successors)
+
+    def reachable(self, roots: Iterable[str] = (START_NODE_NAME,)
+                  ) -> set[str]:
+        """Return the names of the nodes reachable from roots.
+
+        By default, from the start node.
+        """
+        return reachable(self.successors, roots)
+
+    def unreachable(self, roots: Iterable[str] = (START_NODE_NAME,)
+                    ) -> list[str]:
+        """Return the names of the nodes not reachable from roots.
+
+        Names are in the order of the data nodes (see
+        DialogueData.node_list).
+        """
+        found = self.reachable(roots)
+        return [name for name in self.successors if name not in found]
@@ -1,12 +1,20 @@
 """The main model definitions."""
+import copy
 import enum
+import pickle
+import sys
+import threading
 from dataclasses import *
-from typing import Iterable, Mapping, ClassVar, Any
+from typing import Iterable, Mapping, ClassVar, Any, Set, Sequence, Callable
 from abc import abstractmethod, ABC
 from collections import ChainMap
+from collections import abc
+from types import MappingProxyType
 
 
 START_NODE_NAME = 'START'
+# Version of the format used by Dialogue.snapshot
+SNAPSHOT_VERSION = 1
 
 
 class VariableType(enum.Enum):
@@ -21,20 +29,126 @@ class NodeError(Exception):
     pass
 
 
+class ValidationError(Exception):
+    """Custom exception for invalid DialogueData (see its validate).
+
+    The list of all the found errors is kept in self.errors.
+    """
+
+    def __init__(self, errors: list[str]):
+        super().__init__('\n'.join(errors))
+        self.errors = errors
+
+
 class Blocking(enum.Enum):
     NON_BLOCKING = 0
     BLOCKING = 1
 
 
-@dataclass
+def intern(value):
+    """Return the interned version of value, if it's a string.
+
+    See sys.intern. Used for strings repeated across many nodes.
+    """
+    if type(value) is str:
+        return sys.intern(value)
+
+    return value
+
+
+@dataclass(slots=True)
 class Node(ABC):
-    """A dialogue designer node."""
+    """A dialogue designer node.
+
+    Nodes of the default model are slotted dataclasses (no instance
+    __dict__). Since zero argument super() doesn't work in slotted
+    dataclasses, their methods call super(NodeClass, self) instead.
+    Repeated strings (eg. node_type) are interned at construction.
+    """
     node_name: str
     node_type: str
     title: str
 
-    parent: ClassVar = None
+    # DialogueData containing the node
+    parent: Any = field(default=None, init=False, repr=False, compare=False)
+    # Position of the node in its DialogueData (see node_list)
+    _index: int = field(default=None, init=False, repr=False, compare=False)
+    # Last node of the chain of passthrough nodes starting from this
+    # one, if any (see DialogueData.link).
+    _chain_end: Any = field(default=None, init=False, repr=False,
+                            compare=False)
+
     blocking: ClassVar = Blocking.NON_BLOCKING
+    # True if the node has no effect other than going to its "next"
+    # node. Chains of non-blocking passthrough nodes are skipped at
+    # once by Dialogue.next_iter. If None, it's decided by
+    # is_passthrough.
+    passthrough: ClassVar = None
+
+    def __post_init__(self):
+        self.node_type = intern(self.node_type)
+        self.title = intern(self.title)
+
+    def __reduce_ex__(self, protocol):
+        """Nodes of a DialogueData are pickled as (parent, _index).
+
+        Their data is pickled along with them (once, see
+        DialogueData.compact), and unpickled nodes are the nodes of the
+        unpickled data. Nodes with no parent are pickled as usual.
+        """
+        if self.parent is None:
+            return super(Node, self).__reduce_ex__(protocol)
+
+        return _node_at, (self.parent, self._index)
+
+    def __copy__(self):
+        """Copy the fields, the copy isn't a node of the data.
+
+        It keeps the same parent (successors are looked up in it).
+        """
+        copied = type(self).__new__(type(self))
+        if hasattr(self, '__dict__'):
+            copied.__dict__.update(self.__dict__)
+        for attr in fields(self):
+            setattr(copied, attr.name, getattr(self, attr.name))
+
+        return copied
+
+    def __deepcopy__(self, memo):
+        """Deep copy the constructor arguments, keep the same parent.
+
+        Computed state (links, compiled state, ...) is not copied.
+        """
+        copied = type(self).__new__(type(self))
+        memo[id(self)] = copied
+        if hasattr(self, '__dict__'):
+            copied.__dict__.update(copy.deepcopy(self.__dict__, memo))
+        for attr in fields(self):
+            if attr.init:
+                value = copy.deepcopy(getattr(self, attr.name), memo)
+            elif attr.name in ('parent', '_index'):
+                value = getattr(self, attr.name)
+            else:
+                value = attr.default
+            setattr(copied, attr.name, value)
+
+        return copied
+
+    @classmethod
+    def is_passthrough(cls) -> bool:
+        """Return whether the nodes of this class are passthrough.
+
+        That is, cls.passthrough if it's explicitly set. Otherwise,
+        only SimpleNode subclasses using SimpleNode's _compute and
+        Node's get_next (eg. not overriding them, directly or through a
+        mixin) are passthrough.
+        """
+        if cls.passthrough is not None:
+            return cls.passthrough
+
+        return (issubclass(cls, SimpleNode)
+                and cls._compute is SimpleNode._compute
+                and cls.get_next is Node.get_next)
 
     def get_next(self, variables: Mapping = {}, *args, **kwargs):
         """Get next node.
@@ -53,8 +167,12 @@ class Node(ABC):
         # Compute
         next_ = self._compute(variables, *args, **kwargs)
 
-        # If the value is None, return it otherwise return the next node
-        return next_ and self.parent.nodes[next_]
+        # If the value is a name, return the node having it. Linked
+        # nodes (see link) can directly return Node instances (or None).
+        if isinstance(next_, str):
+            return self.parent.nodes[next_]
+
+        return next_
 
     @abstractmethod
     def _compute(self, variables: Mapping, *args, **kwargs) -> str:
@@ -68,42 +186,557 @@ class Node(ABC):
 
         If there is not next node to go to, return None.
 
+        If the node has been linked (see link), the next Node instance
+        can be returned instead of its name.
+
         Additional arguments (args, kwargs) are passed from the get_next
         method.
         """
         pass
 
+    def successors(self) -> Iterable[str]:
+        """Return the names of the nodes that may follow this one.
 
-@dataclass
+        None values (end of a branch) are allowed. Override this method
+        in subclasses (returning () if the node always ends the
+        dialogue): it is used to validate, index (see graph), prune and
+        analyze the data, which fail on nodes not declaring it.
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not declare its successors')
+
+    def assigned_variables(self) -> Iterable[str]:
+        """Return the names of the variables this node may set."""
+        return ()
+
+    def validate(self, variables: Set[str]) -> list[str]:
+        """Return a list of error messages about this node.
+
+        "variables" contains the names of all the known variables.
+        Successors are already validated by the DialogueData, override
+        this method in subclasses for additional checks.
+        """
+        return []
+
+    def compile(self):
+        """Prepare the node for faster computation.
+
+        Called by DialogueData.compile. Override this method in
+        subclasses if some work (eg. parsing) can be done ahead of time.
+        """
+        pass
+
+    def link(self, nodes: Mapping[str, 'Node']):
+        """Resolve successor names to Node instances.
+
+        Called by DialogueData.link. Override this method in
+        subclasses, so that _compute can return Node instances instead
+        of names. Names missing from "nodes" shall be left as they are.
+        """
+        pass
+
+
+@dataclass(slots=True)
 class SimpleNode(Node):
-    """Basic node having a "next" field."""
+    """Basic node having a "next" field.
+
+    A passthrough node (see Node.is_passthrough). Subclasses
+    overriding _compute or get_next are not, unless they explicitly
+    set passthrough to True.
+    """
     next: str = None
 
+    _next: Any = field(default=None, init=False, repr=False, compare=False)
+
     def _compute(self, variables: Mapping) -> str:
         """Basic behaviour, return next node's name."""
-        return self.next
+        return self._next or self.next
+
+    def successors(self) -> Iterable[str]:
+        return (self.next,)
+
+    def link(self, nodes: Mapping[str, Node]):
+        self._next = nodes.get(self.next, self.next)
+
+
+class LazyNodes(abc.Mapping):
+    """Read-only mapping of node names to nodes, built on first access.
+
+    names are the names of the nodes, in order. build is called with
+    the index of a name the first time the node is requested, and must
+    return the node having that name. Nodes are then kept.
+
+    Given to a DialogueData in place of the nodes, it makes the data
+    lazy (see DialogueData): only the visited nodes are ever built.
+    Iterating over the values builds all the nodes. Thread safe: each
+    node is built only once.
+    """
+
+    def __init__(self, names: Sequence[str], build: Callable[[int], Node]):
+        self.names = tuple(names)
+        self._build = build
+        self._positions = {name: index for index, name
+                           in enumerate(self.names)}
+        self._nodes = [None] * len(self.names)
+        # Raw records to drop once their node is built (see
+        # from_records)
+        self._records = None
+        self._lock = threading.Lock()
+        # DialogueData owning the nodes (see Node.parent)
+        self.parent = None
+
+    @classmethod
+    def from_records(cls, names: Sequence[str], records: list,
+                     build: Callable[[Any], Node]) -> 'LazyNodes':
+        """Build the nodes from raw records (eg. dictionaries).
+
+        records[i] describes the node having names[i], build is called
+        with it to get the node. Each record is dropped from the list
+        as soon as its node is built.
+        """
+        nodes = cls(names, lambda index: build(records[index]))
+        nodes._records = records
+
+        return nodes
+
+    def __getitem__(self, name: str) -> Node:
+        return self.get_by_index(self._positions[name])
+
+    def __contains__(self, name) -> bool:
+        return name in self._positions
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_by_index(self, index: int) -> Node:
+        """Return the node having the given position (see node_list)."""
+        node = self._nodes[index]
+        if node is not None:
+            return node
+
+        index = range(len(self.names))[index]
+        with self._lock:
+            node = self._nodes[index]
+            if node is None:
+                node = self._build(index)
+                node.parent = self.parent
+                node._index = index
+                self._nodes[index] = node
+
+                if self._records is not None:
+                    self._records[index] = None
+
+        return node
+
+    @property
+    def built(self) -> int:
+        """Number of nodes built so far."""
+        return len(self._nodes) - self._nodes.count(None)
+
+    @property
+    def node_list(self) -> Sequence[Node]:
+        """Sequence of the nodes, in order (see DialogueData)."""
+        return _LazyNodeList(self)
+
+
+class _LazyNodeList(abc.Sequence):
+    """Sequence view of a LazyNodes, see LazyNodes.node_list."""
+    __slots__ = ('_nodes',)
+
+    def __init__(self, nodes: LazyNodes):
+        self._nodes = nodes
+
+    def __getitem__(self, index: int) -> Node:
+        if isinstance(index, slice):
+            return [self._nodes.get_by_index(i)
+                    for i in range(len(self))[index]]
+
+        return self._nodes.get_by_index(index)
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+@dataclass
+class UpdateResult:
+    """Names of the nodes affected by DialogueData.update.
+
+    "updated" nodes were modified in place, "replaced" ones were
+    replaced by a node of a different class.
+    """
+    added: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+    replaced: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.replaced
+                    or self.removed)
 
 
 class DialogueData:
     """Container of Nodes.
 
     Contains an organized set of Nodes and a dictionary of variables.
+
+    Nodes are linked to each other at construction (see link), the
+    data shall be considered immutable afterwards. Nodes can only be
+    part of one DialogueData (see Node.parent).
+
+    If validate is True, the data is validated after construction (see
+    validate). If compile is True, the data is compiled (see compile).
+
+    A single instance can be shared by any number of Dialogue
+    instances, even across threads, as long as it's not modified: see
+    freeze.
+
+    Instances are pickled in a compact form (see compact), the nodes
+    are rebuilt and linked again when unpickled.
+
+    If nodes is a LazyNodes, the data is lazy: each node is only built
+    the first time it's requested. Lazy nodes are not linked (see
+    link), operations involving all the nodes (eg. validate, compile,
+    freeze, compact) build all of them.
     """
+    frozen = False
 
-    def __init__(self, nodes: Iterable[Node], variables: dict):
+    def __init__(self, nodes: Iterable[Node], variables: dict,
+                 validate: bool = False, compile: bool = False):
         self.variables = variables
 
-        # Compute a map of nodes, in the form: {node_name: Node}
-        self.nodes = {node.node_name: node for node in nodes}
+        if isinstance(nodes, LazyNodes):
+            self.nodes = nodes
+            self.node_list = nodes.node_list
+            nodes.parent = self
+        else:
+            # Compute a map of nodes, in the form: {node_name: Node}
+            self.nodes = {node.node_name: node for node in nodes}
+            # Nodes in order, node._index is the position of a node
+            self.node_list = tuple(self.nodes.values())
 
-        # Link nodes to this instance
-        for node in nodes:
-            node.parent = self
+            # Link nodes to this instance
+            for index, node in enumerate(self.node_list):
+                node.parent = self
+                node._index = index
+
+            self.link()
+
+        if validate:
+            self.validate()
+
+        if compile:
+            self.compile()
+
+    def __setattr__(self, name, value):
+        if self.frozen:
+            raise FrozenInstanceError(f'cannot assign to field {name!r}, '
+                                      'the DialogueData is frozen')
+
+        super().__setattr__(name, value)
+
+    def __reduce__(self):
+        return _from_compact, (self.compact(),)
 
     @property
     def start_node(self):
         return self.nodes[START_NODE_NAME]
 
+    def graph(self) -> 'DialogueGraph':
+        """Return an adjacency index of the nodes.
+
+        See ddesigner.graph.DialogueGraph. The index is built each time
+        this method is called, in O(V+E).
+        """
+        from ddesigner.graph import DialogueGraph
+
+        return DialogueGraph(self)
+
+    def prune_unreachable(self) -> 'DialogueData':
+        """Return a copy of the data without the unreachable nodes.
+
+        Nodes that can't be reached from the start node (see
+        DialogueGraph.reachable) are left out, the others are rebuilt
+        from their constructor arguments (see compact). The original
+        data is not modified. The copy is frozen if the original is.
+        """
+        reachable = self.graph().reachable()
+        nodes, variables, frozen = self.compact()
+        nodes = tuple(compact_node for compact_node, node
+                      in zip(nodes, self.node_list)
+                      if node.node_name in reachable)
+
+        return _from_compact((nodes, variables, frozen))
+
+    def compact(self) -> tuple:
+        """Return a compact, picklable representation of the data.
+
+        The representation is a tuple in the form:
+        (nodes, variables, frozen), where nodes is a tuple of
+        (node_class, init_arguments) pairs. Only the fields accepted by
+        the nodes' constructors are kept: links, compiled conditions
+        and any other computed state is rebuilt by _from_compact.
+        """
+        nodes = tuple((type(node), {attr.name: getattr(node, attr.name)
+                                    for attr in fields(node) if attr.init})
+                      for node in self.node_list)
+
+        return nodes, dict(self.variables), self.frozen
+
+    def freeze(self) -> 'DialogueData':
+        """Make the data read-only and return it.
+
+        The data is compiled (see compile), variables and nodes are
+        replaced by read-only mappings, and the data can't be linked
+        (see link) anymore. After freezing, computing nodes causes no
+        modification to the data, so that the instance can be safely
+        shared (eg. between threads). Nodes themselves shall not be
+        modified either.
+        """
+        if self.frozen:
+            return self
+
+        self.compile()
+        self.variables = MappingProxyType(dict(self.variables))
+        self.nodes = MappingProxyType(self.nodes)
+        super().__setattr__('frozen', True)
+
+        return self
+
+    def known_variables(self) -> Set[str]:
+        """Return the names of all the variables that may be defined.
+
+        That is, the names of the data variables, global variables
+        (see Dialogue.global_variables) and variables set by the nodes.
+        """
+        known = set(self.variables)
+        known.update(Dialogue.global_variables)
+
+        for node in self.nodes.values():
+            known.update(node.assigned_variables())
+
+        return known
+
+    def validate(self):
+        """Check the data for errors.
+
+        Missing start node, successors referring to missing nodes
+        and all the errors reported by the nodes themselves (see
+        Node.validate) are collected. If any, a ValidationError
+        listing all of them is raised.
+        """
+        errors = []
+        if START_NODE_NAME not in self.nodes:
+            errors.append(f'Missing start node {START_NODE_NAME!r}')
+
+        variables = self.known_variables()
+        for name, node in self.nodes.items():
+            for successor in node.successors():
+                if successor is not None and successor not in self.nodes:
+                    errors.append(f'{name}: next node {successor!r} '
+                                  'does not exist')
+
+            errors.extend(f'{name}: {error}'
+                          for error in node.validate(variables))
+
+        if errors:
+            raise ValidationError(errors)
+
+    def compile(self):
+        """Prepare all the nodes for faster computation.
+
+        All the nodes are compiled (see Node.compile, eg. conditions are
+        parsed), so that computing them requires no further parsing.
+        """
+        for node in self.nodes.values():
+            node.compile()
+
+    def update(self, nodes: Iterable[Node], removed: Iterable[str] = (),
+               variables: Mapping = None,
+               dialogues: Iterable['Dialogue'] = ()) -> UpdateResult:
+        """Add or change the given nodes and remove the given names.
+
+        Useful to reload a modified dialogue while it's being used (see
+        ddesigner.reload_json). Nodes having a new name are added.
+        Existing nodes are modified in place if the new node has the
+        same class (the instance is kept, so that dialogues sitting on
+        it stay valid), and replaced otherwise: dialogues sitting on
+        replaced nodes are moved to the new ones, if given in
+        "dialogues". Replaced and removed nodes are unlinked, so that
+        dialogues sitting on them can still go on (successors are looked
+        up by name).
+
+        If given, variables replace the data variables (in place, so
+        that existing dialogues see them). All the nodes are linked
+        again (see link), compiled state of the changed nodes is
+        discarded. Indices of the nodes (see node_list) change if
+        nodes are removed: SessionState instances taken before the
+        update are not valid anymore (snapshots are, see
+        Dialogue.snapshot). Frozen and lazy data can't be updated.
+        """
+        self._check_update()
+
+        result = UpdateResult()
+        replacements = {}
+        for node in nodes:
+            name = node.node_name
+            current = self.nodes.get(name)
+            if current is None:
+                result.added.append(name)
+                node.parent = self
+                self.nodes[name] = node
+            elif type(current) is type(node):
+                result.updated.append(name)
+                for attr in fields(node):
+                    if attr.init:
+                        setattr(current, attr.name, getattr(node, attr.name))
+                _reset_node(current)
+            else:
+                result.replaced.append(name)
+                replacements[id(current)] = node
+                node.parent = self
+                self.nodes[name] = node
+                _reset_node(current)
+
+        for name in removed:
+            node = self.nodes.pop(name, None)
+            if node is not None:
+                result.removed.append(name)
+                _reset_node(node)
+
+        # Nodes keep their order, new ones are appended
+        self.node_list = tuple(self.nodes.values())
+        for index, node in enumerate(self.node_list):
+            node._index = index
+
+        if variables is not None:
+            self.variables.clear()
+            self.variables.update(variables)
+
+        for dialogue in dialogues:
+            dialogue.current_node = replacements.get(
+                id(dialogue.current_node), dialogue.current_node)
+
+        self.link()
+
+        return result
+
+    def _check_update(self):
+        """Raise an error if the data can't be updated (see update)."""
+        if self.frozen:
+            raise FrozenInstanceError('the DialogueData is frozen')
+        if isinstance(self.nodes, LazyNodes):
+            raise NodeError('lazy data can not be updated')
+
+    def link(self):
+        """Link all the nodes to their successors (see Node.link).
+
+        Linked nodes can compute their successors without looking
+        them up by name. Chains of passthrough nodes are detected as
+        well (see Node.passthrough). Called at construction, call it
+        again if the nodes are manually modified.
+        """
+        if self.frozen:
+            raise FrozenInstanceError('the DialogueData is frozen')
+
+        for node in self.nodes.values():
+            node.link(self.nodes)
+
+        self._link_chains()
+
+    def _link_chains(self):
+        """Compute the end of every chain of passthrough nodes.
+
+        Each non-blocking passthrough node gets a reference to the last
+        passthrough node reachable from it by following "next"
+        references (Node._chain_end). Nodes in a cycle of passthrough
+        nodes (or leading to one) have no chain end.
+        """
+        def passthrough(node):
+            return (isinstance(node, SimpleNode)
+                    and type(node).is_passthrough()
+                    and node.blocking is Blocking.NON_BLOCKING)
+
+        for node in self.nodes.values():
+            node._chain_end = None
+
+        done = set()
+        for node in self.nodes.values():
+            path = []
+            current = node
+            while passthrough(current) and id(current) not in done:
+                done.add(id(current))
+                path.append(current)
+                current = current._next
+
+            if not path:
+                continue
+
+            if passthrough(current):
+                # Reached an already processed chain (None if the chain
+                # is a cycle)
+                end = current._chain_end
+            else:
+                end = path[-1]
+
+            for path_node in path:
+                path_node._chain_end = end
+
+
+def _node_at(data: DialogueData, index: int) -> Node:
+    """Return the node at the given index of data (see Node.__reduce_ex__)."""
+    return data.node_list[index]
+
+
+def _reset_node(node: Node):
+    """Reset the computed state of a node (links, compiled state, ...).
+
+    All the fields not given to the constructor are set to their
+    default value, except for parent.
+    """
+    for attr in fields(node):
+        if not attr.init and attr.name != 'parent':
+            setattr(node, attr.name, attr.default)
+
+
+def _from_compact(compact: tuple) -> DialogueData:
+    """Rebuild a DialogueData from its compact form (see compact)."""
+    nodes, variables, frozen = compact
+    data = DialogueData((node_class(**arguments)
+                         for node_class, arguments in nodes), variables)
+
+    if frozen:
+        data.freeze()
+
+    return data
+
+
+class SessionState:
+    """Minimal state of a dialogue session (see Dialogue.state).
+
+    Contains the index of the current node (see DialogueData.node_list)
+    and the local variables of the session (a dictionary, or None if
+    there are none). Much lighter than a Dialogue: useful to keep
+    many idle sessions over the same DialogueData in memory.
+    """
+    __slots__ = ('node_index', 'variables')
+
+    def __init__(self, node_index: int, variables: dict = None):
+        self.node_index = node_index
+        self.variables = variables
+
+    def __repr__(self):
+        return f'SessionState({self.node_index!r}, {self.variables!r})'
+
+    def __eq__(self, other):
+        if not isinstance(other, SessionState):
+            return NotImplemented
+
+        return (self.node_index == other.node_index
+                and (self.variables or {}) == (other.variables or {}))
+
 
 class Dialogue:
     """A state machine encapsulating a DialogueData instance.
@@ -114,14 +747,71 @@ class Dialogue:
     Variables are looked up using a ChainMap, meaning that the
     contained DialogueData variables are kept constant. Do not manually
     modify DialogueData variables.
+
+    If a SessionState is given, the dialogue resumes from it (its
+    variables are used as local variables, without copying them).
     """
     global_variables: Mapping[str, Any] = {}
 
-    def __init__(self, data: DialogueData):
+    def __init__(self, data: DialogueData, state: SessionState = None):
         self.data = data
 
-        self.current_node = data.start_node
-        self.variables = ChainMap({}, data.variables, self.global_variables)
+        if state is None:
+            self.current_node = data.start_node
+            local_variables = {}
+        else:
+            self.current_node = data.node_list[state.node_index]
+            local_variables = state.variables
+            if local_variables is None:
+                local_variables = {}
+
+        self.variables = ChainMap(local_variables, data.variables,
+                                  self.global_variables)
+
+    @property
+    def state(self) -> SessionState:
+        """The current state of the session, see SessionState.
+
+        The local variables are shared (not copied) with the
+        returned state.
+        """
+        return SessionState(self.current_node._index,
+                            self.variables.maps[0] or None)
+
+    def snapshot(self, binary: bool = False):
+        """Return a compact, versioned representation of the session.
+
+        The snapshot is a tuple in the form:
+        (SNAPSHOT_VERSION, current_node_name, local_variables_items)
+        If binary is True, the tuple is pickled to bytes. The data
+        itself is not part of the snapshot: it can be restored (see
+        restore) by any Dialogue on the same data (even a different
+        instance loaded from the same file).
+        """
+        snapshot = (SNAPSHOT_VERSION, self.current_node.node_name,
+                    tuple(self.variables.maps[0].items()))
+
+        if binary:
+            return pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+
+        return snapshot
+
+    def restore(self, snapshot):
+        """Restore a snapshot (see snapshot), tuple or bytes.
+
+        The current node and the local variables are replaced. Only
+        restore binary snapshots from trusted sources (they are
+        unpickled).
+        """
+        if isinstance(snapshot, (bytes, bytearray, memoryview)):
+            snapshot = pickle.loads(snapshot)
+
+        version, node_name, variables = snapshot
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'Unsupported snapshot version {version}')
+
+        self.current_node = self.data.nodes[node_name]
+        self.variables.maps[0] = dict(variables)
 
     def __getitem__(self, index):
         """Access a local variable."""
@@ -154,13 +844,20 @@ class Dialogue:
 
         Nodes' blocking property can be changed via the class field
         Node.blocking (possible values come from the Blocking enum).
+        Chains of passthrough nodes are computed by DialogueData.link:
+        call it again after changing the blocking property of a class
+        of passthrough nodes.
 
         Any additional arguments (args, kwargs) will be passed to
         the first computed node (to Node.get_next(...).
         Subsequent non-blocking nodes will receive no arguments.
         """
         node = self.next(*args, **kwargs)
-        while node is not None and node.blocking == Blocking.NON_BLOCKING:
+        while node is not None and node.blocking is Blocking.NON_BLOCKING:
+            # Skip chains of passthrough nodes (see Node.is_passthrough)
+            if node._chain_end is not None:
+                self.current_node = node._chain_end
+
             node = self.next()
 
         return node
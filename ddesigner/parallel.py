@@ -0,0 +1,87 @@
+"""Parallel execution of work over dialogue data, using processes.
+
+A DialogueData is shipped to each worker process once (in its compact
+form, see DialogueData.compact), then work items (eg. simulation
+seeds) are distributed over the workers. Results are always returned
+in the order of the items, so that merging them is deterministic.
+
+Functions given to the runners must be picklable (eg. defined at the
+top level of a module). Results are pickled back: returning nodes
+sends their whole data back as well (see Node.__reduce_ex__).
+"""
+import multiprocessing
+from typing import Callable, Iterable
+
+from ddesigner.model import *
+from ddesigner.model import _from_compact
+
+
+# Data shipped to the current worker process (see _init_worker)
+_worker_data: DialogueData = None
+
+
+def _init_worker(compact: tuple):
+    global _worker_data
+    _worker_data = _from_compact(compact)
+
+
+def _call_with_data(args):
+    function, item = args
+    return function(_worker_data, item)
+
+
+def map_data(function: Callable, data: DialogueData, items: Iterable,
+             processes: int = None, chunksize: int = 1) -> list:
+    """Return [function(data, item) for item in items], in parallel.
+
+    The data is sent to each one of the worker processes only once.
+    processes is the number of workers (by default, the number of
+    CPUs). chunksize is the number of items sent to a worker at once.
+    """
+    tasks = [(function, item) for item in items]
+
+    with multiprocessing.Pool(processes, _init_worker,
+                              (data.compact(),)) as pool:
+        return pool.map(_call_with_data, tasks, chunksize)
+
+
+def _call_with_file(args):
+    import ddesigner
+
+    function, path, load_kwargs = args
+    return function(ddesigner.from_file(path, **load_kwargs))
+
+
+def map_files(function: Callable, paths: Iterable, processes: int = None,
+              chunksize: int = 1, **load_kwargs) -> list:
+    """Return [function(data) for each file in paths], in parallel.
+
+    Each file is loaded by a worker process (see ddesigner.from_file,
+    load_kwargs are passed to it), so that only paths and results are
+    exchanged with the workers. See map_data for the other arguments.
+    """
+    tasks = [(function, path, load_kwargs) for path in paths]
+
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(_call_with_file, tasks, chunksize)
+
+
+def _validation_errors(data: DialogueData) -> list:
+    try:
+        data.validate()
+    except ValidationError as error:
+        return error.errors
+
+    return []
+
+
+def validate_files(paths: Iterable, processes: int = None,
+                   chunksize: int = 1, **load_kwargs) -> list:
+    """Validate many files in parallel (see DialogueData.validate).
+
+    Return a list containing, for each file, the list of the found
+    errors (empty if the file is valid). See map_files for the
+    arguments.
+    """
+    return map_files(_validation_errors, paths, processes, chunksize,
+                     **load_kwargs)
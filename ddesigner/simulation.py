@@ -0,0 +1,217 @@
+"""Monte Carlo simulation of dialogues, to obtain path statistics.
+
+Requires numpy.
+
+Playthroughs are run in batches (see ddesigner.batch), choices in
+messages are taken by a policy (see simulate).
+"""
+from collections import Counter
+from dataclasses import *
+
+import numpy as np
+
+from ddesigner.model import *
+from ddesigner.default_model import *
+from ddesigner.batch import DialogueBatch, MISSING, END
+from ddesigner.parallel import map_data
+
+# Steps (of all the runs of a batch) after which the distinct visits
+# are merged, see simulate_batch
+MERGE_STEPS = 16
+
+
+def available_choices(batch: DialogueBatch, node: ShowMessageNode,
+                      rows: np.ndarray) -> np.ndarray:
+    """Return which choices of the node are available to the sessions.
+
+    The result is a boolean matrix (rows x choices). Conditional
+    choices are available if their condition holds.
+    """
+    from ddesigner.batch import ColumnsView
+    from ddesigner.conditional import vectorized_expression_evaluate
+
+    available = np.ones((len(rows), len(node.choices)), dtype=bool)
+    for i, choice in enumerate(node.choices):
+        if choice.get('is_condition') and choice.get('condition'):
+            available[:, i] = vectorized_expression_evaluate(
+                choice['condition'], ColumnsView(batch, rows), len(rows))
+
+    return available
+
+
+def random_policy(batch: DialogueBatch, node: ShowMessageNode,
+                  rows: np.ndarray) -> np.ndarray:
+    """Choice policy: pick uniformly between the available choices.
+
+    If no choice is available, no choice is taken (-1).
+    """
+    available = available_choices(batch, node, rows)
+    # Pick the available choice with the highest random key
+    keys = np.where(available, batch.rng.random(available.shape), -1.)
+    return np.where(available.any(axis=1), keys.argmax(axis=1), -1)
+
+
+def first_policy(batch: DialogueBatch, node: ShowMessageNode,
+                 rows: np.ndarray) -> np.ndarray:
+    """Choice policy: pick the first available choice.
+
+    If no choice is available, no choice is taken (-1).
+    """
+    available = available_choices(batch, node, rows)
+    return np.where(available.any(axis=1), available.argmax(axis=1), -1)
+
+
+@dataclass
+class SimulationResult:
+    """Statistics collected by simulate.
+
+    Nodes are identified by name. For each node, "visits" counts the
+    total number of visits, "reached" the number of runs visiting it
+    at least once and "ends" the number of runs ending on it. Runs
+    not ending within the maximum number of steps are counted in
+    "unfinished". "variables" maps each variable name to a histogram
+    (Counter) of its final values over all the runs.
+    """
+    runs: int = 0
+    unfinished: int = 0
+    visits: Counter = field(default_factory=Counter)
+    reached: Counter = field(default_factory=Counter)
+    ends: Counter = field(default_factory=Counter)
+    variables: dict = field(default_factory=dict)
+
+    def reach_probability(self, node_name: str) -> float:
+        """Return the estimated probability of reaching a node."""
+        return self.reached[node_name] / self.runs
+
+    def end_probabilities(self) -> dict:
+        """Return the estimated probability of ending on each node."""
+        return {name: count / self.runs for name, count in self.ends.items()}
+
+    def merge(self, other: 'SimulationResult') -> 'SimulationResult':
+        """Add the statistics of another result to this one.
+
+        Return self.
+        """
+        self.runs += other.runs
+        self.unfinished += other.unfinished
+        self.visits.update(other.visits)
+        self.reached.update(other.reached)
+        self.ends.update(other.ends)
+        for name, histogram in other.variables.items():
+            self.variables.setdefault(name, Counter()).update(histogram)
+
+        return self
+
+
+def _histogram(column: np.ndarray) -> Counter:
+    """Return the histogram of the values in a column."""
+    if column.dtype != object:
+        values, counts = np.unique(column, return_counts=True)
+        return Counter(dict(zip(values.tolist(), counts.tolist())))
+
+    return Counter(value for value in column if value is not MISSING)
+
+
+def _node_counter(data: DialogueData, counts: np.ndarray) -> Counter:
+    """Convert an array of counts by node index to a Counter by name."""
+    return Counter({data.node_list[index].node_name: int(counts[index])
+                    for index in np.flatnonzero(counts)})
+
+
+def simulate_batch(data: DialogueData, runs: int, policy=random_policy,
+                   seed=None, max_steps: int = 10000) -> SimulationResult:
+    """Run a single batch of playthroughs, see simulate."""
+    batch = DialogueBatch(data, runs, seed)
+    node_count = len(data.node_list)
+    rows = np.arange(runs)
+
+    # Show message nodes having choices, by index
+    has_choices = np.array([isinstance(node, ShowMessageNode)
+                            and bool(node.choices)
+                            for node in data.node_list])
+
+    visits = np.bincount(batch.current, minlength=node_count)
+    # Distinct visits, encoded as row * node_count + node index, used
+    # to count the runs reaching each node. New visits are merged
+    # every few steps, so that memory doesn't grow with the steps.
+    visited = np.unique(rows * node_count + batch.current)
+    pending = []
+    pending_size = 0
+
+    active = np.ones(runs, dtype=bool)
+    for _ in range(max_steps):
+        choices = None
+        choosing = np.flatnonzero(active & has_choices[batch.current])
+        if len(choosing):
+            choices = np.full(runs, -1, dtype=np.intp)
+            current = batch.current[choosing]
+            for index in np.unique(current):
+                group = choosing[current == index]
+                choices[group] = policy(batch, data.node_list[index], group)
+
+        result = batch.next(choices, active)
+        active &= result != END
+        moved = np.flatnonzero(active)
+        if not len(moved):
+            break
+
+        visits += np.bincount(result[moved], minlength=node_count)
+        pending.append(moved * node_count + result[moved])
+        pending_size += len(moved)
+        if pending_size >= MERGE_STEPS * runs:
+            visited = np.union1d(visited, np.concatenate(pending))
+            pending.clear()
+            pending_size = 0
+
+    if pending:
+        visited = np.union1d(visited, np.concatenate(pending))
+    reached = np.bincount(visited % node_count, minlength=node_count)
+    ends = np.bincount(batch.current[~active], minlength=node_count)
+
+    return SimulationResult(
+        runs, int(active.sum()), _node_counter(data, visits),
+        _node_counter(data, reached), _node_counter(data, ends),
+        {name: _histogram(column) for name, column in batch.columns.items()})
+
+
+def _simulate_batch_task(data: DialogueData, task) -> SimulationResult:
+    return simulate_batch(data, *task)
+
+
+def simulate(data: DialogueData, runs: int, policy=random_policy,
+             seed=None, max_steps: int = 10000, batch_size: int = 100000,
+             processes: int = None) -> SimulationResult:
+    """Run a number of playthroughs of a dialogue, return statistics.
+
+    Each run starts from the start node and advances (see
+    DialogueBatch.next) until the end of a branch or until max_steps
+    steps are made. Blocking nodes don't stop the runs.
+
+    When a run reaches a message having choices, one is taken by the
+    policy: a callable accepting a DialogueBatch, the message node and
+    the indices of the sessions (rows) to choose for, and returning an
+    array of choice indices (negative for no choice). See
+    random_policy (default) and first_policy.
+
+    Runs are executed in batches of batch_size, each one with its own
+    random generator derived from seed. If processes is given, batches
+    are distributed over a pool of processes (see
+    ddesigner.parallel.map_data). Given the same seed and batch_size,
+    results are always the same.
+    """
+    sizes = [min(batch_size, runs - start)
+             for start in range(0, runs, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(size, policy, batch_seed, max_steps)
+             for size, batch_seed in zip(sizes, seeds)]
+
+    if processes is None:
+        results = (_simulate_batch_task(data, task) for task in tasks)
+    else:
+        results = map_data(_simulate_batch_task, data, tasks, processes)
+
+    total = SimulationResult()
+    for result in results:
+        total.merge(result)
+
+    return total
@@ -0,0 +1,92 @@
+"""Incremental loading of large exports.
+
+Requires ijson.
+
+The json is parsed as a stream of events: each node is built as soon
+as its description has been read, and the description is dropped
+right away. The whole document is never kept in memory, so that peak
+memory stays close to the size of the resulting DialogueData.
+"""
+import io
+import os
+from typing import TextIO, BinaryIO, Iterator, Union
+
+import ijson
+
+from ddesigner import _build_node
+from ddesigner.model import *
+from ddesigner import default_model
+
+# Prefixes (see ijson.parse) of the parts of the first dialogue of
+# an export
+NODES_PREFIX = 'item.nodes.item'
+VARIABLES_PREFIX = 'item.variables'
+DIALOGUE_PREFIX = 'item'
+
+
+def iter_values(file: Union[TextIO, BinaryIO],
+                prefixes: set[str]) -> Iterator[tuple[str, object]]:
+    """Yield (prefix, value) for each value found at the given prefixes.
+
+    Values are built (see ijson.ObjectBuilder) only for the given
+    prefixes, one at a time. The iteration stops at the end of the
+    first element of the top level array (the first dialogue).
+    """
+    events = ijson.parse(file, use_float=True)
+    for prefix, event, value in events:
+        if prefix == DIALOGUE_PREFIX and event == 'end_map':
+            return
+
+        if prefix not in prefixes:
+            continue
+
+        if event not in ('start_map', 'start_array'):
+            yield prefix, value
+            continue
+
+        builder = ijson.ObjectBuilder()
+        depth = 0
+        while True:
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+                if not depth:
+                    break
+
+            _, event, value = next(events)
+
+        yield prefix, builder.value
+
+
+def from_file(file: Union[TextIO, BinaryIO, str, os.PathLike],
+              node_map=default_model.NODE_TYPE_MAP,
+              validate: bool = False,
+              compile: bool = False) -> DialogueData:
+    """Import and return data from file, incrementally.
+
+    Same as ddesigner.from_file, but the file is read as a stream
+    (see iter_values). file can be a binary file object or a path.
+    Text files are read through their underlying binary buffer.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as opened_file:
+            return from_file(opened_file, node_map, validate, compile)
+
+    # Keep the text file referenced: once collected, it would close the
+    # shared buffer
+    binary_file = file
+    if isinstance(file, io.TextIOWrapper):
+        binary_file = file.buffer
+
+    variables = {}
+    nodes = []
+    for prefix, value in iter_values(binary_file,
+                                     {NODES_PREFIX, VARIABLES_PREFIX}):
+        if prefix == NODES_PREFIX:
+            nodes.append(_build_node(value, node_map))
+        else:
+            variables = {key: val['value'] for key, val in value.items()}
+
+    return DialogueData(nodes, variables, validate, compile)
@@ -14,5 +14,8 @@ setup(name='python-ddesigner',
       author_email='franc.mistri@gmail.com',
       license='MIT',
       packages=['ddesigner'],
-      install_requires=REQUIREMENTS
+      python_requires='>=3.10',
+      install_requires=REQUIREMENTS,
+      entry_points={'console_scripts': ['ddesigner=ddesigner.__main__:main']},
+      extras_require={'batch': ['numpy'], 'streaming': ['ijson']}
       )
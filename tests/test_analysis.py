@@ -0,0 +1,166 @@
+from context import ddesigner
+from ddesigner.model import *
+from ddesigner.default_model import *
+from ddesigner.analysis import *
+
+import pytest
+
+
+@pytest.fixture
+def loop_data():
+    arr = (SimpleNode('START', '', '', '1'),
+           ShowMessageNode('1', '', '', None, choices=[
+               {'is_condition': False, 'next': '2', 'text': {}},
+               {'is_condition': True, 'condition': 'var1 > 0',
+                'next': '3', 'text': {}},
+               {'is_condition': False, 'next': '4', 'text': {}}]),
+           SetVariableNode('2', '', '', '5', 'var1', 1,
+                           operation_type=OperationType.ADD.value),
+           SetVariableNode('3', '', '', None, 'var2', 'three'),
+           ChanceBranchNode('4', '', '', chance_1=25, chance_2=75,
+                            branches={'1': '2', '2': None}),
+           WaitNode('5', '', '', '1', 1),
+           SimpleNode('6', '', '', '1'))
+
+    return DialogueData(arr, {'var1': 0, 'var2': 'none'})
+
+
+def test_transitions(loop_data):
+    nodes = loop_data.nodes
+
+    assert transitions(nodes['START']) == {'1': 1}
+    assert transitions(nodes['3']) == {END: 1}
+    assert transitions(nodes['4']) == {'2': 0.25, END: 0.75}
+    # The conditional choice is available half of the times
+    assert transitions(nodes['1']) == {'2': pytest.approx(5 / 12),
+                                       '3': pytest.approx(1 / 6),
+                                       '4': pytest.approx(5 / 12)}
+    assert transitions(nodes['1'], {'var1 > 0': 0}) == {'2': 0.5, '4': 0.5}
+
+    condition = ConditionBranchNode('c', '', '', 'var1 > 0',
+                                    {'True': 't', 'False': 'f'})
+    assert transitions(condition) == {'t': 0.5, 'f': 0.5}
+    assert transitions(condition, {'c': 0.2}) == {'t': 0.2, 'f': 0.8}
+    assert transitions(condition, {'var1 > 0': 1}) == {'t': 1}
+    assert transitions(condition, default=0.1) == {'t': 0.1, 'f': 0.9}
+
+    condition.text = '1 > 2 or False'
+    assert transitions(condition) == {'f': 1}
+
+
+def test_dag():
+    arr = (SimpleNode('START', '', '', '1'),
+           ChanceBranchNode('1', '', '', chance_1=1, chance_2=3,
+                            branches={'1': '2', '2': '3'}),
+           RandomBranchNode('2', '', '', possibilities=3,
+                            branches={'1': '3', '2': '4', '3': '4'}),
+           SimpleNode('3', '', '', None),
+           SimpleNode('4', '', '', '3'),
+           SimpleNode('5', '', '', '3'))
+    result = analyze(DialogueData(arr, {}))
+
+    assert result.reach_probability('2') == pytest.approx(1 / 4)
+    assert result.reach_probability('3') == pytest.approx(1)
+    assert result.reach_probability('4') == pytest.approx(1 / 6)
+    assert result.reach_probability('5') == 0
+    assert result.visits == result.reach
+    assert result.end_probabilities() == {'3': pytest.approx(1)}
+    assert result.unfinished == 0
+
+
+def test_loops(loop_data):
+    result = analyze(loop_data)
+
+    # Back to node 1 with probability 5/12 + 5/12 * 1/4 = 25/48
+    assert result.reach_probability('3') == pytest.approx(8 / 23)
+    assert result.end_probabilities() == {'3': pytest.approx(8 / 23),
+                                          '4': pytest.approx(15 / 23)}
+    assert result.visits['1'] == pytest.approx(48 / 23)
+    assert result.reach_probability('1') == pytest.approx(1)
+    assert result.reach_probability('2') == pytest.approx(25 / 48)
+    assert '6' not in result.reach
+
+    # Uniform choices, back to node 1 with probability 5/12
+    result = analyze(loop_data, {'var1 > 0': 1}, 0)
+    assert result.reach_probability('2') == pytest.approx(5 / 12)
+    assert result.visits['1'] == pytest.approx(12 / 7)
+
+
+def test_unfinished():
+    arr = (SimpleNode('START', '', '', '1'),
+           ChanceBranchNode('1', '', '', chance_1=1, chance_2=1,
+                            branches={'1': '2', '2': None}),
+           SimpleNode('2', '', '', '3'),
+           SimpleNode('3', '', '', '2'))
+    result = analyze(DialogueData(arr, {}))
+
+    assert result.unfinished == pytest.approx(0.5)
+    assert result.ends == {'1': pytest.approx(0.5)}
+    assert result.reach_probability('3') == pytest.approx(0.5)
+    assert result.visits['3'] == float('inf')
+
+
+def test_simulation_agreement(loop_data):
+    pytest.importorskip('numpy')
+    from ddesigner.simulation import simulate
+
+    # Make all the choices unconditional, so that the analysis is
+    # exact
+    loop_data.nodes['1'].choices[1]['is_condition'] = False
+    expected = analyze(loop_data)
+    simulated = simulate(loop_data, 20000, seed=3)
+
+    for name, probability in expected.reach.items():
+        assert simulated.reach_probability(name) == pytest.approx(
+            probability, abs=0.02)
+    for name, probability in expected.ends.items():
+        assert simulated.end_probabilities()[name] == pytest.approx(
+            probability, abs=0.02)
+
+
+def test_available_choices():
+    # The message goes to next if no choice is available
+    message = ShowMessageNode('m', '', '', 'n', choices=[
+        {'is_condition': True, 'condition': 'var1 > 0', 'next': 'a',
+         'text': {}},
+        {'is_condition': True, 'condition': 'var2 > 0', 'next': 'b',
+         'text': {}}])
+    assert transitions(message, {'var2 > 0': 0}) == {'a': 0.5, 'n': 0.5}
+    assert transitions(message) == {'a': 0.375, 'b': 0.375, 'n': 0.25}
+
+
+def test_missing_node():
+    arr = (SimpleNode('START', '', '', '1'),
+           ChanceBranchNode('1', '', '', chance_1=1, chance_2=1,
+                            branches={'1': 'missing', '2': None}))
+
+    with pytest.raises(ValidationError):
+        analyze(DialogueData(arr, {}))
+
+
+def test_conditional_choices_simulation():
+    pytest.importorskip('numpy')
+    from ddesigner.simulation import simulate
+
+    # var1 > 0 holds with probability 1/2 when reaching the messages
+    arr = (ChanceBranchNode('START', '', '', chance_1=1, chance_2=1,
+                            branches={'1': '1', '2': '2'}),
+           SetVariableNode('1', '', '', '2', 'var1', 1),
+           ShowMessageNode('2', '', '', 'B', choices=[
+               {'is_condition': True, 'condition': 'var1 > 0', 'next': 'A',
+                'text': {}},
+               {'is_condition': False, 'next': '3', 'text': {}}]),
+           ShowMessageNode('3', '', '', 'B', choices=[
+               {'is_condition': True, 'condition': 'var2 > 0', 'next': 'A',
+                'text': {}}]),
+           SimpleNode('A', '', '', None),
+           SimpleNode('B', '', '', None))
+    data = DialogueData(arr, {'var1': 0, 'var2': 0})
+
+    expected = analyze(data, {'var1 > 0': 0.5, 'var2 > 0': 0})
+    simulated = simulate(data, 20000, seed=4)
+    assert expected.reach_probability('A') == pytest.approx(0.25)
+    assert expected.reach_probability('B') == pytest.approx(0.75)
+    for name, probability in expected.reach.items():
+        assert simulated.reach_probability(name) == pytest.approx(
+            probability, abs=0.02)
@@ -0,0 +1,176 @@
+import dataclasses
+import os.path as op
+
+from context import ddesigner
+from ddesigner.default_model import *
+from ddesigner.model import *
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from ddesigner.batch import *       # NOQA
+
+FILES_PATH = op.join(op.dirname(__file__), 'files')
+
+
+@pytest.fixture
+def chain1_data():
+    with open(op.join(FILES_PATH, 'chain1.json')) as file:
+        return ddesigner.from_file(file)
+
+
+@pytest.fixture
+def branching_data():
+    arr = (SetVariableNode('START', '', '', '1', 'var1', 1,
+                           operation_type=OperationType.ADD.value),
+           ConditionBranchNode('1', '', '', 'var1 > 2 && var2',
+                               {'True': '2', 'False': '3'}),
+           ShowMessageNode('2', '', '', 'START', text={'ENG': 'true'},
+                           choices=[{'next': '3', 'text': {}},
+                                    {'next': None, 'text': {}}]),
+           SetVariableNode('3', '', '', '4', 'var3', 'text'),
+           ChanceBranchNode('4', '', '', chance_1=50, chance_2=50,
+                            branches={'1': '5', '2': 'START'}),
+           WaitNode('5', '', '', 'START', 1))
+
+    return DialogueData(arr, {'var1': 0, 'var2': True})
+
+
+def test_next(chain1_data):
+    batch = DialogueBatch(chain1_data, 3)
+    nodes = chain1_data.nodes
+
+    assert (batch.next() == nodes['6732512']._index).all()
+    assert (batch.current == nodes['6732512']._index).all()
+
+    batch.next_iter()
+    assert (batch.current == nodes['3124818']._index).all()
+
+    assert (batch.next_iter() == END).all()
+    assert (batch.current == nodes['1451742']._index).all()
+    assert (batch['var1'] == 0).all()
+
+
+def test_lazy_data(branching_data):
+    lazy = ddesigner.from_file(op.join(FILES_PATH, 'chain1.json'),
+                               lazy=True)
+    batch = DialogueBatch(lazy, 3)
+    batch.next_iter()
+    assert (batch.current == lazy.nodes['6732512']._index).all()
+    batch.next_iter()
+    assert (batch.current == lazy.nodes['3124818']._index).all()
+    assert (batch.next_iter() == END).all()
+    assert (batch['var1'] == 0).all()
+
+    # Same steps as linked data
+    nodes = list(branching_data.node_list)
+    lazy = DialogueData(LazyNodes([node.node_name for node in nodes],
+                                  lambda index: dataclasses.replace(
+                                      nodes[index])),
+                        dict(branching_data.variables))
+    batch = DialogueBatch(lazy, 50, seed=2)
+    expected = DialogueBatch(branching_data, 50, seed=2)
+    choices = np.arange(50) % 3 - 1
+    for _ in range(10):
+        assert (batch.next(choices) == expected.next(choices)).all()
+
+
+def test_mask(chain1_data):
+    batch = DialogueBatch(chain1_data, 3)
+
+    result = batch.next(mask=np.array([True, False, True]))
+    assert list(result == END) == [False, True, False]
+    assert batch.current[1] == chain1_data.start_node._index
+
+
+def test_consistency(branching_data):
+    batch = DialogueBatch(branching_data, 100, seed=1)
+    dialogues = [Dialogue(branching_data) for _ in range(100)]
+    choices = np.arange(100) % 3 - 1
+
+    for _ in range(20):
+        result = batch.next(choices)
+
+        for row, dial in enumerate(dialogues):
+            if dial.current_node.node_name == '4':
+                # Replay the random choices made by the batch
+                dial.current_node = branching_data.node_list[result[row]]
+            elif choices[row] < 0 or dial.current_node.node_name != '2':
+                dial.next()
+            else:
+                dial.next(choices[row])
+
+            assert dial.current_node._index == batch.current[row]
+            assert dict(dial.variables) == dict(batch.variables(row))
+
+
+def test_variables(branching_data):
+    batch = DialogueBatch(branching_data, 4)
+
+    assert batch['var1'].dtype.kind == 'i'
+    assert batch['var2'].dtype.kind == 'b'
+    assert batch['var3'][0] is MISSING
+    assert 'var3' not in batch.variables(0)
+
+    batch.next()
+    assert (batch['var1'] == 1).all()
+    variables = batch.variables(0)
+    assert variables['var1'] == 1 and type(variables['var1']) is int
+
+    # Assigning values of a different kind converts the column
+    batch.assign('var1', np.array([0]), 1.5)
+    assert batch['var1'].dtype == object
+    assert batch['var1'][0] == 1.5 and batch['var1'][1] == 1
+
+    variables['var4'] = 'new'
+    assert batch.state(0).variables['var4'] == 'new'
+    assert batch['var4'][1] is MISSING
+    del variables['var4']
+    assert 'var4' not in variables
+
+
+def test_generic_nodes():
+    class CountNode(SimpleNode):
+        def _compute(self, variables, increment=1):
+            variables['count'] = variables.get('count', 0) + increment
+            return super()._compute(variables)
+
+    data = DialogueData([CountNode('START', '', '', None)], {})
+    batch = DialogueBatch(data, 3)
+
+    assert (batch.next(np.array([-1, 2, 3])) == END).all()
+    assert list(batch['count']) == [1, 2, 3]
+
+
+def test_condition_missing_variables():
+    arr = (SetVariableNode('START', '', '', '1', 'var3', 'set'),
+           ConditionBranchNode('1', '', '', 'var2 || var3 == "set"',
+                               {'True': '2', 'False': None}),
+           WaitNode('2', '', '', None))
+    data = DialogueData(arr, {'var2': True})
+
+    batch = DialogueBatch(data, 2)
+    batch.current[:] = 1
+    batch.assign('var3', np.array([0]), 'set')
+
+    # Row 1 misses var3, but it is not needed
+    assert list(batch.next()) == [2, 2]
+
+
+def test_condition_operands():
+    arr = (ConditionBranchNode('START', '', '', '(var1 && var2) > 0',
+                               {'True': '1', 'False': None}),
+           ConditionBranchNode('1', '', '', '1 / var2 > 0',
+                               {'True': None, 'False': None}))
+    data = DialogueData(arr, {'var1': 1, 'var2': 5})
+
+    # Operators return their operands, as in Dialogue
+    batch = DialogueBatch(data, 3)
+    batch.assign('var2', np.array([1]), -5)
+    batch.assign('var2', np.array([2]), 0)
+    assert list(batch.next()) == [1, END, END]
+
+    # Division by zero raises the same error as in Dialogue
+    batch.current[:] = 1
+    with pytest.raises(ZeroDivisionError):
+        batch.next()
@@ -0,0 +1,121 @@
+import os.path as op
+import subprocess
+import sys
+
+from context import ddesigner
+from ddesigner.model import *
+from ddesigner.default_model import *
+from ddesigner import binary
+from ddesigner.__main__ import main
+
+import pytest
+
+FILES_PATH = op.join(op.dirname(__file__), 'files')
+CHAIN1_PATH = op.join(FILES_PATH, 'chain1.json')
+
+
+@pytest.fixture
+def data():
+    arr = (SimpleNode('START', '', '', '1'),
+           ShowMessageNode('1', '', '', '2',
+                           text={'ENG': 'hi ${var1} {x}', 'ITA': 'ciao'},
+                           choices=[{'is_condition': False, 'next': '2',
+                                     'text': {'ENG': '${var2}'}}]),
+           ConditionBranchNode('2', '', '', 'var1 > 1.5 && !var3',
+                               {'True': '3', 'False': 'missing'}),
+           SetVariableNode('3', '', '', None, 'var2', 'done'),
+           ChanceBranchNode('4', '', '', chance_1=1, chance_2=2,
+                            branches={'1': '1', '2': None}))
+
+    return DialogueData(arr, {'var1': 2, 'var2': 'x', 'var3': False,
+                              'var4': 0.5, 'var5': None})
+
+
+def test_round_trip(data, tmp_path):
+    path = tmp_path / 'data.ddb'
+    binary.write(data, path)
+    loaded = binary.load(path)
+
+    assert loaded.variables == data.variables
+    assert list(loaded.nodes) == list(data.nodes)
+    assert loaded.nodes.built == 0
+    assert loaded.start_node == data.start_node
+    assert loaded.nodes.built == 1
+    assert list(loaded.node_list) == list(data.node_list)
+    assert loaded.node_list[2].parent is loaded
+    assert loaded.node_list[-1].node_name == '4'
+
+    dial = Dialogue(loaded)
+    assert dial.next_iter().node_name == '1'
+    assert dial.current_node.parse_text(variables=dial.variables) \
+        == 'hi 2 {x}'
+    assert dial.current_node.parse_choices(variables=dial.variables) \
+        == ['x']
+    assert dial.next_iter() is None
+    assert dial['var2'] == 'done'
+
+
+def test_precompiled(data):
+    loaded = binary.loads(binary.dumps(data))
+
+    message = loaded.nodes['1']
+    assert set(message._templates) == {'ENG', 'ITA'}
+    condition = loaded.nodes['2']
+    assert condition._evaluator({'var1': 2, 'var3': False})
+    assert not condition._evaluator({'var1': 2, 'var3': True})
+
+
+def test_reader(data):
+    reader = binary.BinaryReader(binary.dumps(data))
+
+    assert reader.node_count == 5
+    assert [reader.name(i) for i in range(5)] == ['START', '1', '2', '3',
+                                                  '4']
+    assert reader.record(3)[3] == binary.NO_VALUE
+
+    with pytest.raises(binary.BinaryFormatError):
+        binary.BinaryReader(b'not a binary file' * 4)
+
+
+def test_unsupported_value():
+    data = DialogueData([SimpleNode('START', '', '', None)],
+                        {'var1': object()})
+
+    with pytest.raises(binary.BinaryFormatError):
+        binary.dumps(data)
+
+
+def test_compile_command(tmp_path):
+    path = tmp_path / 'chain1.ddb'
+    main(['compile', '--validate', '--prune', CHAIN1_PATH, str(path)])
+
+    # Loading and running requires no expression engine
+    code = ('import sys\n'
+            'from ddesigner import binary, Dialogue\n'
+            f'dial = Dialogue(binary.load({str(path)!r}))\n'
+            'while dial.next_iter() is not None:\n'
+            '    pass\n'
+            'assert dial["var1"] == 0\n'
+            'assert "lark" not in sys.modules\n')
+    subprocess.run([sys.executable, '-c', code], check=True,
+                   cwd=op.join(op.dirname(__file__), '..'))
+
+
+def test_batch():
+    pytest.importorskip('numpy')
+    from ddesigner.batch import DialogueBatch, END
+    from ddesigner.simulation import simulate
+
+    data = ddesigner.from_file(CHAIN1_PATH)
+    loaded = binary.loads(binary.dumps(data))
+    batch = DialogueBatch(loaded, 3)
+    expected = DialogueBatch(data, 3)
+    for _ in range(3):
+        assert (batch.next_iter() == expected.next_iter()).all()
+        assert (batch.current == expected.current).all()
+    assert (batch.next_iter() == END).all()
+    assert (batch['var1'] == 0).all()
+
+    result = simulate(binary.loads(binary.dumps(data)), 10, seed=1)
+    assert result.end_probabilities() \
+        == simulate(data, 10, seed=1).end_probabilities()
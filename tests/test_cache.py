@@ -0,0 +1,93 @@
+import os
+import os.path as op
+
+from context import ddesigner
+from ddesigner.model import *
+from ddesigner.default_model import *
+from ddesigner.cache import *
+
+import pytest
+
+FILES_PATH = op.join(op.dirname(__file__), 'files')
+CHAIN1_PATH = op.join(FILES_PATH, 'chain1.json')
+
+
+def run(data):
+    dial = Dialogue(data)
+    while dial.next_iter() is not None:
+        pass
+
+    return dial['var1']
+
+
+def test_memory_cache():
+    cache = LoadCache(maxsize=2)
+
+    data = cache.from_file(CHAIN1_PATH)
+    with open(CHAIN1_PATH) as file:
+        assert cache.from_file(file) is data
+    with open(CHAIN1_PATH, 'rb') as file:
+        assert cache.from_json(file.read()) is data
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert run(data) == 0
+
+    # Shared entries can't be modified
+    assert data.frozen
+    with pytest.raises(TypeError):
+        data.variables['var1'] = 1
+
+    # Different options or node maps are different entries
+    lazy = cache.from_file(CHAIN1_PATH, lazy=True)
+    assert lazy is not data
+    assert lazy.frozen
+    node_map = dict(NODE_TYPE_MAP)
+    assert cache.from_file(CHAIN1_PATH, node_map) is not data
+    assert len(cache) == 2
+
+    # Least recently used entry was discarded
+    assert cache.from_file(CHAIN1_PATH) is not data
+    assert cache.misses == 4
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hits == cache.misses == 0
+
+
+@pytest.mark.parametrize('disk_format', list(DISK_FORMATS))
+def test_disk_cache(tmp_path, disk_format):
+    cache = LoadCache(directory=tmp_path, disk_format=disk_format)
+    data = cache.from_file(CHAIN1_PATH)
+    assert len(os.listdir(tmp_path)) == 1
+
+    other_cache = LoadCache(directory=tmp_path, disk_format=disk_format)
+    cached = other_cache.from_file(CHAIN1_PATH, compile=True)
+    assert cached is not data
+    assert list(cached.node_list) == list(data.node_list)
+    assert cached.variables == data.variables
+    assert run(cached) == 0
+    assert len(os.listdir(tmp_path)) == 1
+
+    # A different node map doesn't use the same file
+    node_map = {**NODE_TYPE_MAP, 'start': ShowMessageNode}
+    LoadCache(directory=tmp_path, disk_format=disk_format).from_file(
+        CHAIN1_PATH, node_map)
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_disk_cache_validate(tmp_path):
+    content = ('[{"variables": {}, "nodes": [{"node_name": "START", '
+               '"node_type": "start", "title": "", "next": "missing"}]}]')
+    LoadCache(directory=tmp_path).from_json(content)
+
+    with pytest.raises(ValidationError):
+        LoadCache(directory=tmp_path).from_json(content, validate=True)
+
+
+def test_node_map_fingerprint():
+    assert (node_map_fingerprint(NODE_TYPE_MAP)
+            == node_map_fingerprint(dict(reversed(NODE_TYPE_MAP.items()))))
+    assert (node_map_fingerprint(NODE_TYPE_MAP)
+            != node_map_fingerprint({'start': SimpleNode}))
+
+    with pytest.raises(ValueError):
+        LoadCache(disk_format='unknown')
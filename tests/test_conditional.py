@@ -1,3 +1,7 @@
+import os.path as op
+
+import lark
+
 from context import ddesigner
 from ddesigner.conditional import *
 
@@ -60,3 +64,105 @@ def test_strings(variables):
     assert arithm_expression_evaluate('var4 == "hello"', variables)
     assert arithm_expression_evaluate('var4 != "hell"', variables)
     assert arithm_expression_evaluate('var4 + "o" == "helloo"', variables)
+
+
+def test_compile_expression(variables):
+    expressions = ('2 * -(3 + 2)', '10 / 10 + 1', '2 // 3 + 2',
+                   'True or False && False', 'not True or False',
+                   '2 > -1 > -100', '(var3 + (var1 - 1) * 2) + 10',
+                   'var2 or var1 > var3', 'var4 + "o" == "helloo"')
+
+    for expression in expressions:
+        assert (compile_expression(expression)(variables)
+                == arithm_expression_evaluate(expression, variables))
+
+
+def test_compile_expression_cache(variables):
+    evaluator = compile_expression('var1 + 2')
+
+    assert compile_expression('var1 + 2') is evaluator
+    assert evaluator(variables) == 12
+    assert evaluator({'var1': 0}) == 2
+
+    with pytest.raises(KeyError):
+        evaluator({})
+
+
+def test_lalr_parser(variables):
+    earley = make_parser(parser='earley')
+    lalr = make_parser(parser='lalr')
+
+    expressions = ('2 * -(3 + 2)', '2 // 3 + 2', '10 / 10 + 1',
+                   'True or False && False', '(True or False) && False',
+                   'not True or False', '!True', '2 > -1 > -100',
+                   '-1 >= -1', '-1 <= -1', '1 != 2', 'var2 or 3 > 2',
+                   '(var3 + (var1 - 1) * 2) + 10', 'var4 + "o" == "helloo"')
+
+    for expression in expressions:
+        assert lalr.parse(expression) == earley.parse(expression)
+        assert (arithm_expression_evaluate(expression, variables, lalr)
+                == arithm_expression_evaluate(expression, variables, earley))
+
+
+def test_parser_cache(tmp_path, variables):
+    cache = str(tmp_path / 'parser.cache')
+
+    make_parser(cache=cache)
+    assert op.exists(cache)
+
+    parser = make_parser(cache=cache)
+    assert arithm_expression_evaluate('var1 + 2', variables, parser) == 12
+
+
+def test_short_circuit(variables):
+    # 'missing' is not defined, it must never be looked up
+    expressions = ('var2 and missing > 3', 'var2 && missing',
+                   'var1 or missing', 'var1 > 3 || missing + 1',
+                   '(var2 && missing) || var1 == 10')
+
+    for expression in expressions:
+        assert arithm_expression_evaluate(expression, variables) \
+            == compile_expression(expression)(variables)
+
+    # lark wraps errors raised during transformations
+    with pytest.raises(lark.exceptions.VisitError):
+        arithm_expression_evaluate('var2 and missing', variables,
+                                   transformer=ArithmExpressionTransformer)
+
+    with pytest.raises(KeyError):
+        compile_expression('var1 and missing')(variables)
+
+
+def test_vectorized_expression_evaluate():
+    np = pytest.importorskip('numpy')
+
+    rows = [{'var1': 10, 'var2': False, 'var3': 120, 'var4': 'hello'},
+            {'var1': -1, 'var2': True, 'var3': 0, 'var4': 'hell'},
+            {'var1': 0, 'var2': True, 'var3': 3, 'var4': ''}]
+    columns = {name: np.array([row[name] for row in rows])
+               for name in rows[0]}
+    columns['var4'] = columns['var4'].astype(object)
+
+    expressions = ('var1 > 0', 'var2 or var1 > var3', '!var2',
+                   'var1 and var3', 'not var1 || var3 // 2 == 1',
+                   '(var3 + (var1 - 1) * 2) + 10 > 0 && !var2',
+                   'var4 + "o" == "helloo"', 'var4 != "hell"', 'True',
+                   '(var2 && var1) < 0', '(var1 || var3) > 5',
+                   '!var4 || var4 == "hell"')
+
+    for expression in expressions:
+        result = vectorized_expression_evaluate(expression, columns)
+        expected = [bool(arithm_expression_evaluate(expression, row))
+                    for row in rows]
+
+        assert result.dtype == bool
+        assert list(result) == expected
+
+    assert list(vectorized_expression_evaluate('1 > 0', {}, 2)) \
+        == [True, True]
+
+    # Invalid operations raise, as in scalar evaluation
+    with pytest.raises(FloatingPointError):
+        vectorized_expression_evaluate('var3 / var1 > 0', columns)
+    with pytest.raises(FloatingPointError):
+        vectorized_expression_evaluate('var3 // var1 > 0', columns)
@@ -1,4 +1,6 @@
 import os.path as op
+import subprocess
+import sys
 
 from collections import Counter
 
@@ -257,3 +259,315 @@ def test_default_from_file(chain1_file):
         pass
 
     assert dial['var1'] == 0
+
+
+def test_from_file_binary_and_path(chain1_file):
+    path = op.join(FILES_PATH, 'chain1.json')
+    expected = ddesigner.from_file(chain1_file)
+
+    with open(path, 'rb') as file:
+        assert list(ddesigner.from_file(file).nodes) == list(expected.nodes)
+
+    data = ddesigner.from_file(path)
+    assert list(data.nodes) == list(expected.nodes)
+    assert data.variables == expected.variables
+
+
+def test_json_decoder(chain1_file):
+    import json
+
+    assert ddesigner.json_decoder('json') is json.loads
+    assert ddesigner.json_decoder() is not None
+    with pytest.raises(ImportError):
+        ddesigner.json_decoder('not_a_json_backend')
+
+    calls = []
+
+    def decoder(json_str):
+        calls.append(json_str)
+        return json.loads(json_str)
+
+    content = chain1_file.read()
+    ddesigner.from_json(content, decoder=decoder)
+    assert calls == [content]
+    ddesigner.from_json(content.encode(), decoder='json')
+
+
+def test_lazy_from_file(chain1_file):
+    data = ddesigner.from_file(chain1_file, lazy=True)
+    assert isinstance(data.nodes, LazyNodes)
+    assert data.nodes.built == 0
+
+    dial = Dialogue(data)
+    assert isinstance(dial.next_iter(), ShowMessageNode)
+    assert data.nodes.built == 2
+
+    while dial.next_iter() is not None:
+        pass
+
+    assert dial['var1'] == 0
+    assert data.nodes.built == len(data.nodes)
+
+    with pytest.raises(ddesigner.UnsupportedNodeError):
+        ddesigner.from_json('[{"variables": {}, "nodes": [{"node_name": '
+                            '"START", "node_type": "repeat"}]}]', lazy=True)
+
+
+def test_compact_nodes(chain1_file):
+    data = ddesigner.from_file(chain1_file)
+    assert not any(hasattr(node, '__dict__') for node in data.node_list)
+
+    language = ''.join(['E', 'NG'])
+    node = ShowMessageNode('1', ''.join(['show_', 'message']), '',
+                           character=['Player', 0],
+                           text={language: 'hello'},
+                           choices=[{'is_condition': False, 'next': None,
+                                     'text': {language: 'choice'}}])
+    assert node.character == ('Player', 0)
+    assert isinstance(node.choices, tuple)
+    assert node.node_type is data.node_list[1].node_type
+    assert next(iter(node.text)) is sys.intern('ENG')
+    assert next(iter(node.choices[0]['text'])) is sys.intern('ENG')
+
+
+def test_reload(chain1_file):
+    import json
+
+    content = chain1_file.read()
+    data = ddesigner.from_json(content)
+    nodes = list(data.node_list)
+
+    assert not ddesigner.reload_json(data, content)
+    assert list(data.node_list) == nodes
+    assert all(a is b for a, b in zip(data.node_list, nodes))
+
+    export = json.loads(content)
+    node_dicts = export[0]['nodes']
+    node_dicts[1]['text']['ENG'] = 'changed ${var1}'
+    node_dicts[3]['node_type'] = 'execute'      # Was a wait node
+    node_dicts[3]['text'] = 'command'
+    del node_dicts[3]['time']
+    node_dicts[4]['text'] = 'var1 == 3'
+    node_dicts.append({'node_name': 'new', 'node_type': 'start',
+                       'title': '', 'next': None})
+    node_dicts[-2]['next'] = 'new'
+    del node_dicts[2]
+    node_dicts[1]['next'] = '3124818'
+    export[0]['variables']['var1']['value'] = 3
+
+    message = data.nodes['6732512']
+    message.parse_text()
+    wait = data.nodes['3124818']
+    dial = Dialogue(data)
+    dial.next_iter()
+    wait_dial = Dialogue(data)
+    wait_dial.current_node = wait
+
+    result = ddesigner.reload_json(data, json.dumps(export),
+                                   dialogues=[wait_dial])
+    assert result.added == ['new']
+    assert sorted(result.updated) == ['1451742', '6732512', '7152878']
+    assert result.replaced == ['3124818']
+    assert result.removed == ['1155722']
+
+    # Updated in place, dialogues follow
+    assert data.nodes['6732512'] is message
+    assert dial.current_node is message
+    assert message.parse_text(variables=dial.variables) == 'changed 3'
+    assert isinstance(wait_dial.current_node, ExecuteNode)
+    assert [node._index for node in data.node_list] == list(range(8))
+
+    while dial.next_iter() is not None:
+        pass
+
+    assert dial['var1'] == 0
+    assert dial.current_node.node_name == 'new'
+
+    # Lazy and frozen data are rejected before building any node
+    lazy = ddesigner.from_json(content, lazy=True)
+    with pytest.raises(NodeError):
+        ddesigner.reload_json(lazy, content)
+    assert lazy.nodes.built == 0
+    with pytest.raises(FrozenInstanceError):
+        ddesigner.reload_json(data.freeze(), content)
+
+
+def test_lazy_expression_engine():
+    # Run in a new interpreter, so that previous imports don't interfere
+    chain1_path = op.join(FILES_PATH, 'chain1.json')
+    code = ('import sys\n'
+            'import ddesigner\n'
+            f'ddesigner.from_file(open({chain1_path!r}))\n'
+            'assert "lark" not in sys.modules\n'
+            'assert "ddesigner.conditional" not in sys.modules\n'
+            'ddesigner.conditional\n'
+            'assert "lark" in sys.modules\n')
+    subprocess.run([sys.executable, '-c', code], check=True,
+                   cwd=op.join(op.dirname(__file__), '..'))
+
+
+def test_validate():
+    arr = (SetVariableNode('START', '', '', '1', 'var2', 1),
+           ShowMessageNode('1', '', '', '2',
+                           text={'ENG': '${var1} ${var2} ${var3}'},
+                           choices=[{'is_condition': False, 'next': '7',
+                                     'text': {'ENG': '${var4}'}}]),
+           ConditionBranchNode('2', '', '', 'var1 >',
+                               {'True': '3', 'False': None}),
+           ConditionBranchNode('3', '', '', 'var1 > var5',
+                               {'True': None, 'False': None}))
+
+    with pytest.raises(ValidationError) as info:
+        DialogueData(arr, {'var1': 0}, validate=True)
+
+    errors = info.value.errors
+    assert len(errors) == 5
+    assert any('7' in error for error in errors)
+    assert any('var3' in error for error in errors)
+    assert any('var4' in error for error in errors)
+    assert any('var5' in error for error in errors)
+    assert any('invalid condition' in error for error in errors)
+
+
+def test_compile(default_model_data2):
+    node = default_model_data2.nodes['2']
+    assert node._evaluator is None
+
+    default_model_data2.compile()
+    assert node._evaluator is not None
+
+
+def test_link(default_model_data1, default_model_data2):
+    node = default_model_data2.nodes['2']
+    assert node._compute({'var1': 11}) is default_model_data2.nodes['3']
+    # Missing nodes are left as names
+    assert node._compute({'var1': 10}) == '4'
+
+    dial = Dialogue(default_model_data1)
+    node = dial.next_iter()
+    assert dial.next(0) is default_model_data1.nodes['5']
+
+
+def test_from_json_validate_compile(chain1_file):
+    data = ddesigner.from_json(chain1_file.read(), validate=True,
+                               compile=True)
+    dial = Dialogue(data)
+
+    while dial.next_iter() is not None:
+        pass
+
+    assert dial['var1'] == 0
+
+
+def test_variables_text_parser_single_pass():
+    string = '${var1}${var2} ${var1}'
+    variables = {'var1': '${var2}', 'var2': '\\1 ${var1}'}
+
+    result = variables_text_parser(string, '', variables)
+    assert result == '${var2}\\1 ${var1} ${var2}'
+
+
+def test_text_template():
+    strings = ('', 'no variables', '${var1}', '{literal} ${var1}${var2}',
+               '$ {} ${var3} ${var1', '${} end')
+    variables = {'var1': 42, 'var2': '{0}', '': 'empty'}
+
+    for string in strings:
+        assert (TextTemplate.from_string(string).render(variables)
+                == variables_text_parser(string, '', variables))
+
+    assert TextTemplate.from_string('${var1} ${var2}').names == ('var1',
+                                                                 'var2')
+
+
+class TestTemplates:
+
+    @pytest.fixture
+    def parsers(self):
+        parsers = ShowMessageNode.parsers
+        yield
+        ShowMessageNode.parsers = parsers
+
+    def test_cache(self, default_model_data1):
+        node = default_model_data1.nodes['4']
+
+        node.parse_text('ITA', {'var1': 1})
+        templates = node.get_templates('ITA')
+        assert templates is node.get_templates('ITA')
+        assert templates[0].names == ('var1',)
+        assert len(templates[1]) == 1
+
+        node.clear_templates()
+        node.compile()
+        assert set(node._templates) == {'ENG', 'ESP'}
+
+    def test_static_parsers(self, default_model_data1, parsers):
+        @static_parser
+        def upper_parser(string, language, variables):
+            return string.upper()
+
+        node = default_model_data1.nodes['4']
+        ShowMessageNode.parsers = [upper_parser, variables_text_parser]
+
+        assert node.parse_text('ENG', {'VAR1': 1}) == 'HELLO WORLD 1'
+        assert node.parse_choices('ENG', {'VAR1': 1}) == ['1 CHOICE']
+        assert node.get_templates() is not None
+
+        node.clear_templates()
+        ShowMessageNode.parsers = [upper_parser]
+        assert node.parse_text('ENG', {'VAR1': 1}) == 'HELLO WORLD ${VAR1}'
+        assert node.get_templates() is not None
+
+    def test_parsers_change(self, default_model_data1, parsers):
+        @static_parser
+        def upper_parser(string, language, variables):
+            return string.upper()
+
+        node = default_model_data1.nodes['4']
+        default_model_data1.freeze()
+        assert node.parse_text('ENG', {'var1': 1}) == 'hello world 1'
+
+        # Templates follow the parsers, no need to clear them
+        ShowMessageNode.parsers = list(ShowMessageNode.parsers)
+        ShowMessageNode.parsers.insert(0, upper_parser)
+        assert node.parse_text('ENG', {'VAR1': 1}) == 'HELLO WORLD 1'
+        assert node.parse_choices('ENG', {'VAR1': 1}) == ['1 CHOICE']
+
+    def test_non_static_parsers(self, default_model_data1, parsers):
+        def language_parser(string, language, variables):
+            return f'{string} {variables["var1"]}'
+
+        node = default_model_data1.nodes['4']
+        ShowMessageNode.parsers = [variables_text_parser, language_parser]
+
+        assert node.parse_text('ENG', {'var1': 1}) == 'hello world 1 1'
+        assert node.get_templates() is None
+
+
+class TestRenderCache:
+
+    @pytest.fixture
+    def render_cache(self):
+        ShowMessageNode.render_cache = RenderCache(maxsize=2)
+        yield ShowMessageNode.render_cache
+        ShowMessageNode.render_cache = None
+
+    def test_render(self, default_model_data1, render_cache):
+        node = default_model_data1.nodes['4']
+
+        assert node.parse_text(variables={'var1': 1}) == 'hello world 1'
+        assert node.parse_text(variables={'var1': 1, 'var2': 0}) \
+            == 'hello world 1'
+        assert node.parse_text(variables={'var1': True}) == 'hello world True'
+        assert (render_cache.hits, render_cache.misses) == (1, 2)
+
+        assert node.parse_choices(variables={'var1': 1}) == ['1 choice']
+        assert len(render_cache) == 2
+
+        # Unhashable values are not cached
+        assert node.parse_text(variables={'var1': []}) == 'hello world []'
+        assert (render_cache.hits, render_cache.misses) == (1, 3)
+
+        render_cache.clear()
+        assert len(render_cache) == 0
+        assert render_cache.hits == 0
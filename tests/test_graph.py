@@ -0,0 +1,94 @@
+from context import ddesigner
+from ddesigner.model import *
+from ddesigner.graph import *
+
+import pytest
+
+
+def test_strongly_connected_components():
+    graph = {1: [2], 2: [3, 4], 3: [1], 4: [5, 'missing'], 5: [4, 6],
+             6: [6], 7: []}
+    components = strongly_connected_components(graph)
+
+    assert sorted(map(sorted, components)) == [[1, 2, 3], [4, 5], [6], [7]]
+    # Reverse topological order
+    position = {vertex: i for i, component in enumerate(components)
+                for vertex in component}
+    assert all(position[target] <= position[vertex]
+               for vertex, targets in graph.items()
+               for target in targets if target in graph)
+
+
+def test_strongly_connected_components_deep():
+    # Long chains and cycles don't hit the recursion limit
+    size = 100000
+    chain = {i: [i + 1] for i in range(size)}
+    assert len(strongly_connected_components(chain)) == size
+
+    cycle = {i: [(i + 1) % size] for i in range(size)}
+    assert len(strongly_connected_components(cycle)) == 1
+
+
+def test_reachable():
+    graph = {1: [2], 2: [3, 'missing'], 3: [2], 4: [1], 5: []}
+
+    assert reachable(graph, [1]) == {1, 2, 3}
+    assert reachable(graph, [4, 5]) == {1, 2, 3, 4, 5}
+    assert reachable(graph, ['missing']) == set()
+
+
+@pytest.fixture
+def data():
+    arr = (SimpleNode('START', '', '', '1'),
+           SimpleNode('1', '', '', '2'),
+           SimpleNode('2', '', '', '1'),
+           SimpleNode('3', '', '', '2'),
+           SimpleNode('4', '', '', 'missing'),
+           SimpleNode('5', '', '', '4'))
+
+    return DialogueData(arr, {'var1': 0})
+
+
+def test_dialogue_graph(data):
+    graph = data.graph()
+
+    assert graph.successors['START'] == ('1',)
+    assert graph.successors['4'] == ()
+    assert graph.predecessors['2'] == ['1', '3']
+    assert graph.predecessors['START'] == []
+    assert graph.reachable() == {'START', '1', '2'}
+    assert graph.unreachable() == ['3', '4', '5']
+    assert graph.unreachable(['5']) == ['START', '1', '2', '3']
+    assert sorted(map(sorted, graph.strongly_connected_components())) == [
+        ['1', '2'], ['3'], ['4'], ['5'], ['START']]
+
+
+def test_prune_unreachable(data):
+    pruned = data.prune_unreachable()
+
+    assert list(pruned.nodes) == ['START', '1', '2']
+    assert pruned.variables == {'var1': 0}
+    assert pruned.nodes['1'] is not data.nodes['1']
+    assert pruned.nodes['1'].get_next() is pruned.nodes['2']
+    assert len(data.nodes) == 6
+
+    assert not pruned.frozen
+    assert data.freeze().prune_unreachable().frozen
+
+
+def test_undeclared_successors():
+    @dataclass(slots=True)
+    class JumpNode(Node):
+        target: str = None
+
+        def _compute(self, variables):
+            return self.target
+
+    data = DialogueData([JumpNode('START', '', '', target='1'),
+                         SimpleNode('1', '', '', None)], {})
+
+    # Not taken as a dead end, which would leave node 1 out
+    with pytest.raises(NotImplementedError):
+        data.prune_unreachable()
+    with pytest.raises(NotImplementedError):
+        data.validate()
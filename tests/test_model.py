@@ -82,3 +82,372 @@ class TestDialogue:
 
         dial.next_iter(True)
         assert dial.current_node.current_val
+
+
+def test_validate():
+    arr = [SimpleNode("START", "", "", "2"), SimpleNode("2", "", "", "3"),
+           SimpleNode("4", "", "", "5")]
+
+    with pytest.raises(ValidationError) as info:
+        DialogueData(arr, {}, validate=True)
+
+    assert len(info.value.errors) == 2
+
+    with pytest.raises(ValidationError) as info:
+        DialogueData(arr[1:], {}, validate=True)
+
+    assert len(info.value.errors) == 3
+
+
+def test_link(simple_blocked_data):
+    nodes = simple_blocked_data.nodes
+
+    assert nodes['START']._compute({}) is nodes['2']
+    assert nodes['5']._compute({}) is None
+
+    dial = Dialogue(simple_blocked_data)
+    assert dial.next_iter() is nodes['3']
+    assert dial.next_iter() is None
+    assert dial.current_node is nodes['5']
+
+
+def test_relink(simple_node_data):
+    nodes = simple_node_data.nodes
+
+    nodes['START'].next = '3'
+    assert nodes['START'].get_next() is nodes['2']
+
+    simple_node_data.link()
+    assert nodes['START'].get_next() is nodes['3']
+
+
+def test_passthrough():
+    class ComputingNode(SimpleNode):
+        def _compute(self, variables):
+            return super()._compute(variables)
+
+    class ExplicitNode(ComputingNode):
+        passthrough = True
+
+    class LoggingMixin:
+        def _compute(self, variables):
+            return SimpleNode._compute(self, variables)
+
+    class LogNode(LoggingMixin, SimpleNode):
+        pass
+
+    class HookNode(SimpleNode):
+        def get_next(self, variables={}, *args, **kwargs):
+            return super().get_next(variables, *args, **kwargs)
+
+    class OptOutNode(SimpleNode):
+        passthrough = False
+
+    assert SimpleNode.is_passthrough()
+    assert SimpleBlockingNode.is_passthrough()
+    assert not ComputingNode.is_passthrough()
+    assert ExplicitNode.is_passthrough()
+    assert not LogNode.is_passthrough()
+    assert not HookNode.is_passthrough()
+    assert not OptOutNode.is_passthrough()
+    assert not ToggleNode.is_passthrough()
+
+
+def test_chain_side_effects():
+    log = []
+
+    class LoggingMixin:
+        def _compute(self, variables):
+            log.append(self.node_name)
+            return SimpleNode._compute(self, variables)
+
+    class LogNode(LoggingMixin, SimpleNode):
+        pass
+
+    class HookNode(SimpleNode):
+        def get_next(self, variables={}, *args, **kwargs):
+            log.append(f'hook:{self.node_name}')
+            return super().get_next(variables, *args, **kwargs)
+
+    arr = [SimpleNode('START', '', '', 'A'), LogNode('A', '', '', 'H'),
+           HookNode('H', '', '', 'B'), SimpleNode('B', '', '', None)]
+    dial = Dialogue(DialogueData(arr, {}))
+
+    assert dial.next_iter() is None
+    assert log == ['A', 'hook:H']
+
+
+def test_blocking_change():
+    class SwitchNode(SimpleNode):
+        pass
+
+    arr = [SimpleNode('START', '', '', 'A'), SimpleNode('A', '', '', 'S'),
+           SwitchNode('S', '', '', 'B'), SimpleNode('B', '', '', None)]
+    data = DialogueData(arr, {})
+
+    SwitchNode.blocking = Blocking.BLOCKING
+    data.link()
+    assert Dialogue(data).next_iter() is data.nodes['S']
+
+
+def test_chains(simple_blocked_data):
+    nodes = simple_blocked_data.nodes
+
+    assert nodes['START']._chain_end is nodes['2']
+    assert nodes['2']._chain_end is nodes['2']
+    # Blocking nodes are not part of chains
+    assert nodes['3']._chain_end is None
+    assert nodes['4']._chain_end is nodes['5']
+
+    dial = Dialogue(simple_blocked_data)
+    assert dial.next_iter() is nodes['3']
+    assert dial.next_iter() is None
+    assert dial.current_node is nodes['5']
+
+
+def test_cyclic_chains():
+    arr = [SimpleNode("START", "", "", "2"), SimpleNode("2", "", "", "3"),
+           SimpleNode("3", "", "", "2"), SimpleNode("4", "", "", "missing")]
+    nodes = DialogueData(arr, {}).nodes
+
+    assert nodes['START']._chain_end is None
+    assert nodes['2']._chain_end is None
+    assert nodes['3']._chain_end is None
+    assert nodes['4']._chain_end is nodes['4']
+
+
+def test_freeze(simple_node_data):
+    data = simple_node_data.freeze()
+
+    assert data is simple_node_data
+    assert data.frozen
+    assert data.freeze() is data
+
+    with pytest.raises(FrozenInstanceError):
+        data.variables = {}
+    with pytest.raises(TypeError):
+        data.variables['var1'] = 'modified'
+    with pytest.raises(TypeError):
+        data.nodes['4'] = SimpleNode('4', '', '', None)
+    with pytest.raises(FrozenInstanceError):
+        data.link()
+
+    dial1, dial2 = Dialogue(data), Dialogue(data)
+    dial1['var1'] = 'not default'
+    dial1.next()
+
+    assert dial2['var1'] == 'default'
+    assert dial2.current_node is data.start_node
+
+
+def test_session_state(simple_blocked_data):
+    nodes = simple_blocked_data.node_list
+    assert [node._index for node in nodes] == list(range(len(nodes)))
+
+    dial = Dialogue(simple_blocked_data)
+    assert dial.state == SessionState(0)
+    assert dial.state.variables is None
+
+    dial['var1'] = 'not default'
+    dial.next_iter()
+    state = dial.state
+    assert state == SessionState(2, {'var1': 'not default'})
+
+    resumed = Dialogue(simple_blocked_data, state)
+    assert resumed.current_node is dial.current_node
+    assert resumed['var1'] == 'not default'
+    assert resumed['var2'] == 'default'
+
+    with pytest.raises(AttributeError):
+        state.other = None
+
+
+def test_snapshot(simple_blocked_data):
+    dial = Dialogue(simple_blocked_data)
+    dial['var1'] = 'not default'
+    dial.next_iter()
+
+    snapshot = dial.snapshot()
+    assert snapshot == (SNAPSHOT_VERSION, '3', (('var1', 'not default'),))
+
+    for snapshot in (snapshot, dial.snapshot(binary=True)):
+        restored = Dialogue(simple_blocked_data)
+        restored.restore(snapshot)
+
+        assert restored.current_node is dial.current_node
+        assert restored['var1'] == 'not default'
+        assert restored.next_iter() is None
+
+    # Restoring discards the previous local variables
+    dial['var2'] = 'not default'
+    dial.restore(snapshot)
+    assert dial['var2'] == 'default'
+
+    with pytest.raises(ValueError):
+        dial.restore((SNAPSHOT_VERSION + 1, '3', ()))
+
+
+def test_pickle(simple_blocked_data):
+    import copy
+    import pickle
+
+    data = pickle.loads(pickle.dumps(simple_blocked_data))
+
+    assert data.variables == simple_blocked_data.variables
+    assert data.node_list == simple_blocked_data.node_list
+    assert all(node.parent is data for node in data.node_list)
+    assert data.nodes['2']._next is data.nodes['3']
+    assert not data.frozen
+
+    dial = Dialogue(data)
+    assert dial.next_iter() is data.nodes['3']
+
+    # Nodes keep their identity
+    dial = pickle.loads(pickle.dumps(Dialogue(simple_blocked_data)))
+    assert dial.current_node is dial.data.start_node
+    assert dial.next_iter() is dial.data.nodes['3']
+    node = pickle.loads(pickle.dumps(simple_blocked_data.nodes['2']))
+    assert node is node.parent.nodes['2']
+
+    # Copies are not reduced to the node of the data
+    node = simple_blocked_data.nodes['2']
+    copied = copy.copy(node)
+    assert copied is not node and copied == node
+    assert copied._next is node._next
+    copied.next = '4'
+    assert node.next == '3'
+    copied = copy.deepcopy(node)
+    assert copied is not node and copied == node
+    assert copied.parent is simple_blocked_data
+    assert copied._next is None
+    assert copied.get_next() is simple_blocked_data.nodes['3']
+
+    loose = pickle.loads(pickle.dumps(SimpleNode('1', '', '', '2')))
+    assert loose == SimpleNode('1', '', '', '2')
+    assert loose.parent is None
+
+    # Frozen data stays frozen, long chains are not a problem
+    arr = [SimpleNode(str(i), '', '', str(i + 1)) for i in range(10000)]
+    arr.append(SimpleNode(START_NODE_NAME, '', '', '0'))
+    data = pickle.loads(pickle.dumps(DialogueData(arr, {}).freeze()))
+
+    assert data.frozen
+    assert data.start_node._chain_end is data.nodes['9999']
+
+
+def test_lazy_nodes():
+    arr = [SimpleNode("START", "", "", "2"), SimpleNode("2", "", "", "3"),
+           SimpleNode("3", "", "", None)]
+    built = []
+
+    def build(index):
+        built.append(index)
+        return arr[index]
+
+    data = DialogueData(LazyNodes([node.node_name for node in arr], build),
+                        {'var1': 'default'})
+    assert built == []
+    assert len(data.node_list) == 3
+    assert '2' in data.nodes and 'missing' not in data.nodes
+
+    dial = Dialogue(data)
+    assert dial.next().node_name == '2'
+    assert built == [0, 1]
+    assert data.nodes.built == 2
+    assert dial.state.node_index == 1
+    assert data.node_list[1] is arr[1] and arr[1].parent is data
+
+    data.freeze()
+    assert built == [0, 1, 2]
+    assert Dialogue(data).next_iter() is None
+
+
+def test_lazy_nodes_from_records():
+    records = [('START', '2'), ('2', None)]
+    nodes = LazyNodes.from_records(
+        ['START', '2'], records,
+        lambda record: SimpleNode(record[0], '', '', record[1]))
+    data = DialogueData(nodes, {})
+
+    assert data.start_node.next == '2'
+    assert records == [None, ('2', None)]
+    assert data.start_node.get_next().node_name == '2'
+    assert records == [None, None]
+
+
+def test_update(simple_blocked_data):
+    data = simple_blocked_data
+    dial = Dialogue(data)
+    assert dial.next_iter().node_name == '3'
+    removed_dial = Dialogue(data)
+    removed_dial.current_node = data.nodes['4']
+    variables = data.variables
+
+    result = data.update([SimpleBlockingNode('3', '', 'changed', '5'),
+                          SimpleBlockingNode('5', '', '', '6'),
+                          SimpleNode('6', '', '', None)],
+                         removed=['4', 'missing'],
+                         variables={'var1': 'new'}, dialogues=[dial])
+    assert result == UpdateResult(added=['6'], updated=['3'],
+                                  replaced=['5'], removed=['4'])
+    assert data.variables is variables
+    assert dial['var1'] == 'new'
+
+    assert dial.current_node is data.nodes['3']
+    assert dial.current_node.title == 'changed'
+    assert dial.next_iter().node_name == '5'
+    assert dial.next_iter() is None
+    assert dial.current_node.node_name == '6'
+
+    # Dialogues on removed nodes go on by name
+    assert removed_dial.next_iter() is data.nodes['5']
+    assert [node.node_name for node in data.node_list] == [
+        'START', '2', '3', '5', '6']
+
+    # Replaced nodes are unlinked as well
+    data = DialogueData([SimpleNode('START', '', '', 'A'),
+                         SimpleNode('A', '', '', 'B'),
+                         SimpleNode('B', '', '', None)], {})
+    dial = Dialogue(data)
+    dial.current_node = data.nodes['A']
+    data.update([SimpleBlockingNode('A', '', '', 'B'),
+                 SimpleBlockingNode('B', '', '', None)])
+    assert dial.next_iter() is data.nodes['B']
+
+    with pytest.raises(FrozenInstanceError):
+        data.freeze().update([])
+
+    lazy = DialogueData(LazyNodes(['START'], lambda index: None), {})
+    with pytest.raises(NodeError):
+        lazy.update([])
+
+
+def test_lazy_nodes_threads():
+    import threading
+
+    names = [str(i) for i in range(50)]
+    names[0] = START_NODE_NAME
+    records = [(name, None) for name in names]
+    start = threading.Barrier(4)
+
+    def build(record):
+        return SimpleNode(record[0], '', '', record[1])
+
+    data = DialogueData(LazyNodes.from_records(names, records, build), {})
+    results = [[] for _ in range(4)]
+
+    def run(result):
+        start.wait()
+        result.extend(data.nodes[name] for name in names)
+
+    threads = [threading.Thread(target=run, args=(result,))
+               for result in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for result in results:
+        assert all(node is data.nodes[node.node_name] for node in result)
+        assert len(result) == 50
+    assert records == [None] * 50
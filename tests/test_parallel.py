@@ -0,0 +1,61 @@
+import json
+import os.path as op
+
+from context import ddesigner
+from ddesigner.model import *
+from ddesigner.default_model import *
+from ddesigner.parallel import *
+
+import pytest
+
+
+FILES_PATH = op.join(op.dirname(__file__), 'files')
+
+
+def run_dialogue(data, var1):
+    dial = Dialogue(data)
+    dial['var1'] = var1
+
+    return dial.next_iter().node_name, dial['var2']
+
+
+def node_count(data):
+    return len(data.nodes)
+
+
+@pytest.fixture
+def branching_data():
+    arr = (SimpleNode('START', '', '', '1'),
+           ConditionBranchNode('1', '', '', 'var1 > 0',
+                               branches={'True': '2', 'False': '3'}),
+           SetVariableNode('2', '', '', '4', 'var2', 'positive'),
+           SetVariableNode('3', '', '', '4', 'var2', 'negative'),
+           ShowMessageNode('4', '', '', None))
+
+    return DialogueData(arr, {'var1': 0, 'var2': 'none'}).freeze()
+
+
+def test_map_data(branching_data):
+    results = map_data(run_dialogue, branching_data, range(-5, 5), 2)
+
+    assert results == [('4', 'positive' if i > 0 else 'negative')
+                       for i in range(-5, 5)]
+
+
+def test_map_files(tmp_path):
+    chain1_path = op.join(FILES_PATH, 'chain1.json')
+    with open(chain1_path) as file:
+        content = json.load(file)
+
+    # Break the start node
+    content[0]['nodes'][0]['next'] = 'missing'
+    broken_path = tmp_path / 'broken.json'
+    broken_path.write_text(json.dumps(content))
+
+    paths = [chain1_path, broken_path, chain1_path]
+    assert map_files(node_count, paths, 2) == [8] * 3
+
+    errors = validate_files(paths, 2)
+    assert errors[0] == errors[2] == []
+    assert len(errors[1]) == 1
+    assert "'missing'" in errors[1][0]
@@ -0,0 +1,93 @@
+from context import ddesigner
+from ddesigner.default_model import *
+from ddesigner.model import *
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from ddesigner.simulation import *      # NOQA
+
+
+@pytest.fixture
+def choices_data():
+    arr = (SimpleNode('START', '', '', '1'),
+           ShowMessageNode('1', '', '', None, choices=[
+               {'is_condition': False, 'next': '2', 'text': {}},
+               {'is_condition': True, 'condition': 'var1 > 0',
+                'next': '3', 'text': {}},
+               {'is_condition': False, 'next': '4', 'text': {}}]),
+           SetVariableNode('2', '', '', '5', 'var1', 1,
+                           operation_type=OperationType.ADD.value),
+           SetVariableNode('3', '', '', None, 'var2', 'three'),
+           ChanceBranchNode('4', '', '', chance_1=25, chance_2=75,
+                            branches={'1': '2', '2': None}),
+           WaitNode('5', '', '', '1', 1))
+
+    return DialogueData(arr, {'var1': 0, 'var2': 'none'})
+
+
+def test_first_policy(choices_data):
+    result = simulate(choices_data, 10, first_policy, max_steps=50)
+
+    # Always the first choice, looping between nodes 1, 2 and 5
+    assert result.runs == 10
+    assert result.unfinished == 10
+    assert not result.ends
+    assert result.reach_probability('2') == 1
+    assert result.reach_probability('3') == 0
+    assert result.visits['START'] == 10
+    assert result.variables['var2'] == {'none': 10}
+
+
+def test_custom_policy(choices_data):
+    def last_policy(batch, node, rows):
+        available = available_choices(batch, node, rows)
+        return available.shape[1] - 1 - available[:, ::-1].argmax(axis=1)
+
+    result = simulate(choices_data, 1000, last_policy, seed=2)
+
+    assert result.reach_probability('4') == 1
+    assert result.unfinished == 0
+    assert result.ends == {'4': 1000}
+    assert result.reach_probability('3') == 0
+    # Back to node 1 with probability 1/4 each time
+    assert result.variables['var1'][0] == pytest.approx(750, abs=50)
+    assert result.reach_probability('2') == pytest.approx(0.25, abs=0.05)
+
+
+def test_random_policy(choices_data):
+    result = simulate(choices_data, 20000, seed=1, batch_size=3000)
+
+    assert result.runs == 20000
+    assert result.reach_probability('START') == 1
+    assert result.reach_probability('1') == 1
+    # First choice: 1/2 to node 2, 1/2 to node 4 (then 1/4 to node 2)
+    assert result.reach_probability('2') == pytest.approx(5 / 8, abs=0.02)
+    # Then var1 > 0: 1/3 for each choice, ending on node 4 with
+    # probability 3/7
+    assert result.end_probabilities()['4'] == pytest.approx(
+        3 / 8 + 5 / 8 * 3 / 7, abs=0.02)
+    assert sum(result.ends.values()) + result.unfinished == 20000
+    assert sum(result.variables['var2'].values()) == 20000
+
+
+def test_determinism(choices_data):
+    result1 = simulate(choices_data, 1000, seed=5, batch_size=300)
+    result2 = simulate(choices_data, 1000, seed=5, batch_size=300,
+                       processes=2)
+
+    assert result1 == result2
+
+
+def test_max_steps():
+    arr = (SimpleNode('START', '', '', '1'), WaitNode('1', '', '', 'START'))
+    result = simulate(DialogueData(arr, {}), 10, max_steps=5)
+
+    assert result.unfinished == 10
+    assert not result.ends
+    assert result.visits == {'START': 30, '1': 30}
+
+    # Distinct visits don't accumulate with the steps
+    result = simulate(DialogueData(arr, {}), 10, max_steps=1000)
+    assert result.reached == {'START': 10, '1': 10}
+    assert result.visits == {'START': 5010, '1': 5000}
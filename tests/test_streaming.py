@@ -0,0 +1,64 @@
+import io
+import json
+import os.path as op
+
+from context import ddesigner
+from ddesigner.model import *
+
+import pytest
+
+streaming = pytest.importorskip('ddesigner.streaming')
+
+FILES_PATH = op.join(op.dirname(__file__), 'files')
+CHAIN1_PATH = op.join(FILES_PATH, 'chain1.json')
+
+
+def test_from_file():
+    expected = ddesigner.from_file(CHAIN1_PATH)
+
+    with open(CHAIN1_PATH, 'rb') as binary, open(CHAIN1_PATH) as text:
+        for file in (CHAIN1_PATH, binary, text):
+            data = streaming.from_file(file, validate=True)
+
+            assert data.variables == expected.variables
+            assert data.node_list == expected.node_list
+
+    dial = Dialogue(data)
+    while dial.next_iter() is not None:
+        pass
+
+    assert dial['var1'] == 0
+
+    # The text file is only referenced by the call
+    data = streaming.from_file(open(CHAIN1_PATH))
+    assert data.node_list == expected.node_list
+
+
+def test_iter_values():
+    # Variables before the nodes, only the first dialogue is read
+    document = [{'variables': {'var1': {'type': 1, 'value': 1.5}},
+                 'nodes': [{'node_name': 'START', 'next': None,
+                            'node_type': 'start', 'title': ''}]},
+                {'nodes': [{'node_name': 'other'}], 'variables': {}}]
+    file = io.BytesIO(json.dumps(document).encode())
+
+    values = list(streaming.iter_values(
+        file, {streaming.NODES_PREFIX, streaming.VARIABLES_PREFIX}))
+    assert values == [
+        (streaming.VARIABLES_PREFIX, {'var1': {'type': 1, 'value': 1.5}}),
+        (streaming.NODES_PREFIX, document[0]['nodes'][0])]
+
+    file.seek(0)
+    data = streaming.from_file(file)
+    assert list(data.nodes) == ['START']
+    assert data.variables == {'var1': 1.5}
+    assert type(data.variables['var1']) is float
+
+
+def test_unsupported_node():
+    document = [{'nodes': [{'node_name': 'START', 'node_type': 'unknown',
+                            'title': ''}], 'variables': {}}]
+    file = io.BytesIO(json.dumps(document).encode())
+
+    with pytest.raises(ddesigner.UnsupportedNodeError):
+        streaming.from_file(file)